@@ -90,7 +90,16 @@ from .utils import (
     file_utils,
     file_watcher,
     preferences,
-    timeline_utils
+    timeline_utils,
+    keyframe_scan,
+    mark_storage,
+    fcurve_clean,
+    folder_events,
+    socket_transport,
+    exchange_store,
+    import_pipeline,
+    action_import,
+    import_cleanup
 )
 
 # Reload modules if already imported
@@ -110,6 +119,15 @@ if "bpy" in locals():
         importlib.reload(file_watcher)
         importlib.reload(preferences)
         importlib.reload(timeline_utils)
+        importlib.reload(keyframe_scan)
+        importlib.reload(mark_storage)
+        importlib.reload(fcurve_clean)
+        importlib.reload(folder_events)
+        importlib.reload(socket_transport)
+        importlib.reload(exchange_store)
+        importlib.reload(action_import)
+        importlib.reload(import_cleanup)
+        importlib.reload(import_pipeline)
     except Exception as e:
         print(f"Error reloading modules: {e}")
 
@@ -148,7 +166,7 @@ def register():
         bpy.types.Scene.btc_show_markers = bpy.props.BoolProperty(
             name="Show Timeline Markers", 
             default=True,
-            update=timeline_utils.update_timeline_markers
+            update=timeline_utils.show_markers_update
         )
         
         # Property cho keyframes
@@ -177,6 +195,16 @@ def register():
     try:
         bpy.app.handlers.load_post.append(file_watcher.load_handler)
         bpy.app.handlers.frame_change_post.append(timeline_utils.frame_change_handler)
+        
+        # Marker index must be rebuilt whenever Blender replaces scene data
+        for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+            handlers.append(timeline_utils.marker_index_reset_handler)
+            handlers.append(keyframe_operators.keyframe_lookup_reset_handler)
+        
+        # Compact mark storage: migrate on load, keep items out of saved files
+        bpy.app.handlers.load_post.append(mark_storage.load_post_handler)
+        bpy.app.handlers.save_pre.append(mark_storage.save_pre_handler)
+        bpy.app.handlers.save_post.append(mark_storage.save_post_handler)
     except Exception as e:
         print(f"Error registering handlers: {e}")
 
@@ -188,11 +216,27 @@ def unregister():
             
         if timeline_utils.frame_change_handler in bpy.app.handlers.frame_change_post:
             bpy.app.handlers.frame_change_post.remove(timeline_utils.frame_change_handler)
+        
+        for handlers in (bpy.app.handlers.undo_post, bpy.app.handlers.redo_post, bpy.app.handlers.load_post):
+            if timeline_utils.marker_index_reset_handler in handlers:
+                handlers.remove(timeline_utils.marker_index_reset_handler)
+            if keyframe_operators.keyframe_lookup_reset_handler in handlers:
+                handlers.remove(keyframe_operators.keyframe_lookup_reset_handler)
+        
+        for handlers, handler in ((bpy.app.handlers.load_post, mark_storage.load_post_handler),
+                                  (bpy.app.handlers.save_pre, mark_storage.save_pre_handler),
+                                  (bpy.app.handlers.save_post, mark_storage.save_post_handler)):
+            if handler in handlers:
+                handlers.remove(handler)
     except Exception as e:
         print(f"Error removing handlers: {e}")
     
     # Stop file watcher if running
     try:
+        file_watcher.stop_active_watcher()
+        socket_transport.close_clients()
+        import_pipeline.cancel_all()
+        
         if hasattr(bpy.types, "WindowManager") and hasattr(bpy.types.WindowManager, "btc_file_watcher"):
             watcher = bpy.context.window_manager.btc_file_watcher
             if watcher:
@@ -0,0 +1,119 @@
+import os
+import time
+import concurrent.futures
+
+from . import commons
+
+
+def export_scene(tool, scene_pr, index, fbx_path):
+    """
+    Export one scene, published atomically (temp file + os.replace).
+    
+    Args:
+        tool: FbxSceneLoader tool, resolved once for the batch
+        scene_pr: Scene to export
+        index: Position of the scene in the batch
+        fbx_path: Target FBX path
+    
+    Returns:
+        Result dictionary with the path, timing and error (None on success)
+    """
+    folder, filename = os.path.split(fbx_path)
+    temp_path = os.path.join(folder, f".{os.path.splitext(filename)[0]}.{os.getpid()}.partial.fbx")
+    result = {"index": index, "fbx_path": fbx_path, "export_ms": 0.0, "error": None}
+    
+    start = time.perf_counter()
+    try:
+        tool.get_fbx_loader(scene_pr).export_all_objects(temp_path)
+        os.replace(temp_path, fbx_path)
+    except Exception as e:
+        result["error"] = str(e)
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+    result["export_ms"] = (time.perf_counter() - start) * 1000.0
+    return result
+
+
+def export_scenes(scenes, tool, fbx_folder, stamp, max_workers=1):
+    """
+    Export every scene of a batch.
+    
+    The FbxSceneLoader tool is passed in so it is resolved once. With
+    max_workers > 1 scenes are exported concurrently.
+    
+    Args:
+        scenes: Scenes to export
+        tool: FbxSceneLoader tool
+        fbx_folder: Folder receiving the FBX files
+        stamp: Text shared by the file names of this batch
+        max_workers: Number of scenes exported at the same time
+    
+    Returns:
+        List of result dictionaries, in scene order
+    """
+    commons.ensure_dir_exists(fbx_folder)
+    jobs = [(scene_pr, i, os.path.join(fbx_folder, f"cascadeur_to_blender_{stamp}_scene{i}.fbx"))
+            for i, scene_pr in enumerate(scenes)]
+    
+    if max_workers <= 1 or len(jobs) <= 1:
+        return [export_scene(tool, *job) for job in jobs]
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=min(max_workers, len(jobs))) as executor:
+        futures = [executor.submit(export_scene, tool, *job) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def batch_trigger_data(results, total_ms, max_workers):
+    """
+    Consolidated trigger data listing every scene of a batch.
+    
+    fbx_paths keeps only the successful exports, as Blender expects.
+    
+    Args:
+        results: Results from export_scenes
+        total_ms: Wall time of the whole batch
+        max_workers: Worker count used
+    
+    Returns:
+        Trigger data dictionary
+    """
+    return {
+        "fbx_paths": [r["fbx_path"] for r in results if not r["error"]],
+        "results": results,
+        "total_ms": total_ms,
+        "workers": max_workers,
+    }
+
+
+def run_batch(scenes, session, fbx_folder, max_workers=1, log=print):
+    """
+    Export scenes and build the consolidated trigger data.
+    
+    Args:
+        scenes: Scenes to export
+        session: Dictionary shared by the handlers of one command run,
+            the FbxSceneLoader tool is resolved through it once per batch
+        fbx_folder: Folder receiving the FBX files
+        max_workers: Number of scenes exported at the same time
+        log: Callable receiving one line per scene
+    
+    Returns:
+        Trigger data dictionary (see batch_trigger_data)
+    """
+    stamp = time.strftime("%Y%m%d%H%M%S")
+    start = time.perf_counter()
+    tool = commons.get_fbx_tool(session)
+    results = export_scenes(scenes, tool, fbx_folder, stamp, max_workers)
+    total_ms = (time.perf_counter() - start) * 1000.0
+    
+    for r in results:
+        if r["error"]:
+            log(f"Failed to export scene {r['index']}: {r['error']}")
+        else:
+            log(f"Exported scene {r['index']} to {r['fbx_path']} in {r['export_ms']:.0f} ms")
+    log(f"Exported {len(results)} scenes in {total_ms:.0f} ms ({max_workers} workers)")
+    
+    return batch_trigger_data(results, total_ms, max_workers)
@@ -1,6 +1,12 @@
 import csc
 import tempfile
 import os
+import re
+import json
+import time
+import itertools
+import threading
+import configparser
 
 
 def set_export_settings(preferences=None):
@@ -46,6 +52,243 @@ def get_export_path(scene_name):
     return os.path.join(temp_dir, file_name)
 
 
+# Default port, same as addon_info.DEFAULT_PORT on the Blender side
+DEFAULT_PORT = 48152
+
+
+# Same naming as file_utils.create_trigger_file on the Blender side:
+# trigger_{action}_{milliseconds}_{pid}_{sequence}.json
+_trigger_sequence = itertools.count(1)
+
+TRIGGER_NAME_PATTERN = re.compile(
+    r"^trigger_(?P<action>.+)_(?P<millis>\d{13})_(?P<pid>\d+)_(?P<seq>\d+)\.json$"
+)
+
+
+def trigger_sort_key(filepath):
+    """
+    Sort key putting triggers in the order they were written.
+    Names without a sequence (older versions) sort by modification time.
+    
+    Args:
+        filepath: Trigger file path
+    
+    Returns:
+        (milliseconds, pid, sequence) tuple
+    """
+    match = TRIGGER_NAME_PATTERN.match(os.path.basename(filepath))
+    if match:
+        return (int(match.group("millis")), int(match.group("pid")), int(match.group("seq")))
+    try:
+        return (int(os.path.getmtime(filepath) * 1000), 0, 0)
+    except OSError:
+        return (0, 0, 0)
+
+
+def trigger_file_name(trigger_data):
+    """
+    File name of a trigger payload, built from its own timestamp, pid and sequence.
+    
+    The same payload always gets the same name, so writing it twice
+    (socket listener and file fallback) leaves a single trigger.
+    
+    Args:
+        trigger_data: Trigger dictionary
+    
+    Returns:
+        trigger_{action}_{milliseconds}_{pid}_{sequence}.json
+    """
+    millis = int(trigger_data.get("timestamp", 0) * 1000)
+    return (f"trigger_{trigger_data.get('action', '')}_{millis:013d}_"
+            f"{trigger_data.get('pid', 0)}_{trigger_data.get('sequence', 0):06d}.json")
+
+
+def write_trigger_data(folder, trigger_data):
+    """
+    Write a trigger payload atomically (temp file + os.replace).
+    
+    Args:
+        folder: Trigger folder
+        trigger_data: Trigger dictionary (see trigger_file_name)
+    
+    Returns:
+        Trigger file path
+    """
+    ensure_dir_exists(folder)
+    filename = trigger_file_name(trigger_data)
+    trigger_path = os.path.join(folder, filename)
+    
+    temp_path = os.path.join(folder, f".{filename}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(trigger_data, f, indent=2)
+        os.replace(temp_path, trigger_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return trigger_path
+
+
+def write_trigger_file(folder, action, data=None, request_ids=None):
+    """
+    Write a trigger file atomically (temp file + os.replace).
+    
+    Args:
+        folder: Trigger folder
+        action: Trigger action name
+        data: Dictionary with trigger data
+        request_ids: Ids of the Blender requests this trigger answers
+    
+    Returns:
+        Trigger file path
+    """
+    trigger_data = {
+        "action": action,
+        "timestamp": time.time(),
+        "pid": os.getpid(),
+        "sequence": next(_trigger_sequence),
+        "request_ids": list(request_ids or []),
+        "data": data or {}
+    }
+    return write_trigger_data(folder, trigger_data)
+
+
+def request_ids(triggers):
+    """
+    Request ids of a group of triggers, in order.
+    
+    Args:
+        triggers: List of trigger dictionaries
+    
+    Returns:
+        List of request ids (triggers without one are skipped)
+    """
+    return [t["request_id"] for t in triggers if t.get("request_id")]
+
+
+def write_reply(session, folder, action, triggers, data=None):
+    """
+    Write a trigger for Blender that answers a group of requests.
+    
+    The answered ids are recorded in the session so trigger_queue.drain
+    does not send a separate request_done for them.
+    
+    Args:
+        session: Dictionary shared by the handlers of one command run
+        folder: Blender trigger folder
+        action: Trigger action name
+        triggers: Trigger dictionaries being answered
+        data: Dictionary with trigger data
+    
+    Returns:
+        Trigger file path
+    """
+    ids = request_ids(triggers)
+    session.setdefault("replied", set()).update(ids)
+    return write_trigger_file(folder, action, data, ids)
+
+
+def read_settings():
+    """
+    Read settings.cfg written next to the commands by the Blender add-on.
+    
+    Returns:
+        ConfigParser with the settings (empty when the file is missing)
+    """
+    config = configparser.ConfigParser()
+    config.read(os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.cfg"))
+    return config
+
+
+def get_exchange_folder():
+    """
+    Exchange folder from settings.cfg, falling back to the temp folder.
+    
+    Returns:
+        Exchange folder path (created if missing)
+    """
+    try:
+        exchange_folder = read_settings().get("Addon Settings", "exchange_folder", fallback=tempfile.gettempdir())
+    except Exception:
+        # Fallback to temp dir
+        exchange_folder = tempfile.gettempdir()
+    
+    if not exchange_folder:
+        exchange_folder = tempfile.gettempdir()
+    
+    return ensure_dir_exists(exchange_folder)
+
+
+def get_socket_port():
+    """
+    Socket port from settings.cfg, matching the Blender add-on preference.
+    
+    Returns:
+        Port number, None when the socket transport is turned off
+    """
+    try:
+        config = read_settings()
+        if not config.getboolean("Addon Settings", "use_socket_transport", fallback=True):
+            return None
+        return config.getint("Addon Settings", "port", fallback=DEFAULT_PORT)
+    except Exception:
+        return DEFAULT_PORT
+
+
+def get_export_workers():
+    """
+    Number of scenes exported at the same time, from settings.cfg.
+    
+    Exports run one at a time unless export_workers is raised; only do
+    that with Cascadeur versions whose FBX exporter is thread safe.
+    
+    Returns:
+        Worker count (at least 1)
+    """
+    try:
+        return max(1, read_settings().getint("Addon Settings", "export_workers", fallback=1))
+    except Exception:
+        return 1
+
+
+def get_fbx_tool(session):
+    """
+    FbxSceneLoader tool, resolved once per session.
+    
+    Args:
+        session: Dictionary shared by the handlers of one command run
+    
+    Returns:
+        FbxSceneLoader tool
+    """
+    if "fbx_tool" not in session:
+        mp = csc.app.get_application()
+        session["fbx_tool"] = mp.get_tools_manager().get_tool("FbxSceneLoader")
+    return session["fbx_tool"]
+
+
+def get_fbx_scene_loader(session, scene_pr=None):
+    """
+    FbxSceneLoader for a scene, resolved once per session.
+    
+    Args:
+        session: Dictionary shared by the handlers of one command run
+        scene_pr: Scene to load into (defaults to the current scene)
+    
+    Returns:
+        FbxSceneLoader object
+    """
+    tool = get_fbx_tool(session)
+    
+    if scene_pr is None:
+        if "fbx_scene_loader" not in session:
+            current = csc.app.get_application().get_scene_manager().current_scene()
+            session["fbx_scene_loader"] = tool.get_fbx_loader(current)
+        return session["fbx_scene_loader"]
+    
+    return tool.get_fbx_loader(scene_pr)
+
+
 def ensure_dir_exists(directory):
     """
     Ensure directory exists, create if not.
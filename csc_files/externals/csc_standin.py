@@ -0,0 +1,170 @@
+"""
+Dry-run stand-in for the Cascadeur csc module.
+
+Lets the export scheduling run without Cascadeur: install() registers a
+fake csc module whose FbxSceneLoader writes small placeholder files
+after a configurable delay and counts tool lookups and concurrent
+exports. From the add-on root:
+
+    python -m csc_files.externals.csc_standin
+"""
+import sys
+import time
+import types
+import tempfile
+import threading
+
+
+class StandInScene:
+    def __init__(self, name):
+        self.name = name
+    
+    def info(self, message):
+        print(f"[{self.name}] {message}")
+    
+    def error(self, message):
+        print(f"[{self.name}] ERROR: {message}")
+
+
+class StandInFbxLoader:
+    def __init__(self, tool, scene):
+        self.tool = tool
+        self.scene = scene
+    
+    def export_all_objects(self, path):
+        tool = self.tool
+        with tool.lock:
+            tool.active += 1
+            tool.peak_active = max(tool.peak_active, tool.active)
+        try:
+            time.sleep(tool.export_seconds)
+            with open(path, 'w') as f:
+                f.write(f"stand-in export of {self.scene.name}\n")
+        finally:
+            with tool.lock:
+                tool.active -= 1
+                tool.exports += 1
+    
+    def import_model(self, path):
+        self.scene.info(f"stand-in import of {path}")
+
+
+class StandInFbxTool:
+    def __init__(self, export_seconds):
+        self.export_seconds = export_seconds
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak_active = 0
+        self.exports = 0
+        self.loader_requests = 0
+    
+    def get_fbx_loader(self, scene):
+        with self.lock:
+            self.loader_requests += 1
+        return StandInFbxLoader(self, scene)
+
+
+class StandInToolsManager:
+    def __init__(self, tool):
+        self.tool = tool
+        self.tool_requests = 0
+    
+    def get_tool(self, name):
+        self.tool_requests += 1
+        if name != "FbxSceneLoader":
+            raise KeyError(name)
+        return self.tool
+
+
+class StandInSceneManager:
+    def __init__(self, scene_count):
+        self._scenes = [StandInScene(f"scene{i}") for i in range(scene_count)]
+    
+    def scenes(self):
+        return list(self._scenes)
+    
+    def current_scene(self):
+        return self._scenes[0] if self._scenes else None
+
+
+class StandInApplication:
+    def __init__(self, scene_count, export_seconds):
+        self.scene_manager = StandInSceneManager(scene_count)
+        self.tools_manager = StandInToolsManager(StandInFbxTool(export_seconds))
+    
+    def get_scene_manager(self):
+        return self.scene_manager
+    
+    def get_tools_manager(self):
+        return self.tools_manager
+
+
+def install(scene_count=3, export_seconds=0.05):
+    """
+    Register a fake csc module in sys.modules.
+    
+    Args:
+        scene_count: Number of open scenes
+        export_seconds: Time each FBX export takes
+    
+    Returns:
+        StandInApplication returned by csc.app.get_application()
+    """
+    application = StandInApplication(scene_count, export_seconds)
+    module = types.ModuleType("csc")
+    module.app = types.SimpleNamespace(get_application=lambda: application)
+    module.fbx = types.SimpleNamespace(
+        FbxSettings=types.SimpleNamespace,
+        FbxSettingsMode=types.SimpleNamespace(Binary="Binary"),
+        FbxSettingsAxis=types.SimpleNamespace(Y="Y", Z="Z"),
+    )
+    module.is_standin = True
+    sys.modules["csc"] = module
+    return application
+
+
+def uninstall():
+    module = sys.modules.get("csc")
+    if module is not None and getattr(module, "is_standin", False):
+        del sys.modules["csc"]
+
+
+def dry_run(scene_count=20, export_seconds=0.05, workers=(1, 4)):
+    """
+    Run the batch exporter against the stand-in and print its schedule.
+    
+    Args:
+        scene_count: Number of scenes to export
+        export_seconds: Time each FBX export takes
+        workers: Worker counts to compare
+    
+    Returns:
+        Dictionary worker count -> (wall ms, peak concurrent exports, tool lookups)
+    """
+    application = install(scene_count, export_seconds)
+    from . import batch_export
+    
+    summary = {}
+    try:
+        for worker_count in workers:
+            tool_requests = application.tools_manager.tool_requests
+            tool = application.tools_manager.tool
+            tool.peak_active = 0
+            
+            # Fresh session per run: the lookups counted are the batch path's own
+            with tempfile.TemporaryDirectory(prefix="b2c_dry_run_") as fbx_folder:
+                data = batch_export.run_batch(application.get_scene_manager().scenes(), {}, fbx_folder,
+                                              worker_count, log=lambda message: None)
+            
+            lookups = application.tools_manager.tool_requests - tool_requests
+            summary[worker_count] = (data["total_ms"], tool.peak_active, lookups)
+            print(f"{worker_count} workers: {len(data['fbx_paths'])}/{scene_count} scenes in "
+                  f"{data['total_ms']:.0f} ms, peak {tool.peak_active} concurrent exports, "
+                  f"{lookups} FbxSceneLoader lookup(s)")
+    finally:
+        uninstall()
+    return summary
+
+
+if __name__ == "__main__":
+    dry_run()
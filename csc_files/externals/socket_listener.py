@@ -0,0 +1,243 @@
+import os
+import json
+import socket
+import struct
+import threading
+
+from . import commons
+
+
+# Same framing as utils/socket_transport.py on the Blender side:
+# 4 byte big-endian length followed by UTF-8 JSON
+HEADER = struct.Struct("!I")
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+DEFAULT_HOST = "127.0.0.1"
+
+
+def send_message(sock, message):
+    """
+    Send one length-prefixed JSON message.
+    
+    Args:
+        sock: Connected socket
+        message: JSON serializable dictionary
+    """
+    payload = json.dumps(message).encode("utf-8")
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Connection closed while reading a message")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock):
+    """
+    Receive one length-prefixed JSON message.
+    
+    Returns:
+        Message dictionary, or None if the peer closed the connection
+    """
+    try:
+        header = _recv_exact(sock, HEADER.size)
+    except ConnectionError:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Message too large: {size} bytes")
+    return json.loads(_recv_exact(sock, size).decode("utf-8"))
+
+
+class SocketListener:
+    """
+    Accept trigger messages from Blender on a loopback port.
+    
+    Every message is written to the trigger folder before it is
+    acknowledged, so it is handled like any trigger file even if this
+    Cascadeur process exits first. The reply tells Blender whether a
+    drain running on Cascadeur's command thread will pick the message
+    up ("draining"), in which case no command has to be launched.
+    A "ping" message is answered directly with the listener status.
+    """
+    
+    def __init__(self, port, folder, host=DEFAULT_HOST):
+        self.port = port
+        self.folder = folder
+        self.host = host
+        self._lock = threading.Lock()
+        # (prefix, actions) of the drains running on the command thread
+        self._drains = []
+        self._connections = set()
+        self._running = False
+        self._thread = None
+        self._sock = None
+    
+    @property
+    def is_running(self):
+        return self._running
+    
+    def start(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((self.host, self.port))
+        sock.listen()
+        self._sock = sock
+        self._running = True
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self):
+        self._running = False
+        # shutdown wakes the thread blocked in accept
+        for sock in [self._sock] + list(self._connections):
+            if sock is None:
+                continue
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                sock.close()
+            except OSError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=1.0)
+    
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+    
+    def _serve(self, conn):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._connections.add(conn)
+        with conn:
+            while self._running:
+                try:
+                    message = recv_message(conn)
+                    if message is None:
+                        break
+                    if message.get("action") == "ping":
+                        send_message(conn, self.status())
+                        continue
+                    send_message(conn, self.store(message))
+                except (OSError, ValueError):
+                    break
+        self._connections.discard(conn)
+    
+    def store(self, message):
+        """
+        Write a message as a trigger file and build the reply.
+        
+        The file has the name Blender would have given it, so a file
+        fallback for the same message does not add a second trigger.
+        
+        Returns:
+            Reply dictionary, status "queued" once the file is written
+        """
+        reply = {"action": message.get("action"), "sequence": message.get("sequence"),
+                 "request_id": message.get("request_id")}
+        try:
+            with self._lock:
+                reply["file"] = commons.write_trigger_data(self.folder, message)
+                filename = os.path.basename(reply["file"])
+                reply["draining"] = any(filename.startswith(prefix) and message.get("action") in actions
+                                        for prefix, actions in self._drains)
+        except OSError as e:
+            # Not acknowledged: Blender writes the trigger file itself
+            reply.update(status="error", error=str(e))
+            return reply
+        reply["status"] = "queued"
+        return reply
+    
+    def status(self):
+        """Reply to a ping"""
+        with self._lock:
+            draining = bool(self._drains)
+        return {"status": "alive", "pid": os.getpid(), "draining": draining}
+    
+    def begin_drain(self, prefix, actions):
+        """
+        Record a drain starting on the command thread.
+        
+        Returns:
+            Token for end_drain
+        """
+        token = (prefix, frozenset(actions))
+        with self._lock:
+            self._drains.append(token)
+        return token
+    
+    def end_drain(self, token, has_pending=None):
+        """
+        Record the end of a drain, unless has_pending() finds new triggers.
+        
+        Runs under the lock store() holds while writing, so a message is
+        either seen by has_pending or answered with "draining": False.
+        
+        Args:
+            token: Value returned by begin_drain
+            has_pending: Callable, True if the drain must go on
+        
+        Returns:
+            True if the drain ended
+        """
+        with self._lock:
+            if has_pending is not None and has_pending():
+                return False
+            self._drains.remove(token)
+        return True
+
+
+# Listener shared by all commands of this Cascadeur session
+_listener = None
+
+
+def ensure_listener(port, folder):
+    """
+    Start the session listener on port if it is not running yet.
+    
+    Args:
+        port: Loopback port
+        folder: Trigger folder receiving the messages
+    
+    Returns:
+        SocketListener, or None if the port could not be bound
+    """
+    global _listener
+    if (_listener is not None and _listener.is_running and _listener.port == port
+            and _listener.folder == folder):
+        return _listener
+    
+    if _listener is not None:
+        _listener.stop()
+    try:
+        _listener = SocketListener(port, folder).start()
+    except OSError as e:
+        print(f"B2C socket listener unavailable on port {port}: {e}")
+        _listener = None
+    return _listener
+
+
+def get_listener():
+    """Running session listener, or None"""
+    return _listener
+
+
+def stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,52 @@
+import os
+import importlib
+
+from . import commons, trigger_queue
+from . import temp_exporter, temp_keyframe_cleaner
+
+
+# Cascadeur chạy command trên main thread của nó, mọi lời gọi csc API
+# đều ở lại thread đó. Thread của socket_listener chỉ ghi message thành
+# file trigger; chúng được xử lý khi một command của add-on chạy. Trong
+# lúc drain chạy, Blender gửi yêu cầu qua socket mà không launch command.
+
+
+def command_name():
+    return "B2C.Command Server"
+
+
+def run_command(scene, triggers, session):
+    """Chạy một command của add-on trong tiến trình đang chạy"""
+    for trigger_data in triggers:
+        command = trigger_data.get("data", {}).get("command", "")
+        if not command.startswith("commands.externals."):
+            scene.error(f"Unknown command: {command}")
+            continue
+        try:
+            module = importlib.import_module(command)
+            # Command chỉ drain trigger: drain hiện tại đã xử lý các trigger đó,
+            # không chạy drain lồng nhau
+            handled = getattr(module, "HANDLERS", None)
+            if handled is not None and set(handled) <= set(HANDLERS):
+                continue
+            module.run(scene)
+        except Exception as e:
+            scene.error(f"Error running {command}: {str(e)}")
+
+
+# Action -> handler(scene, triggers, session) cho mọi yêu cầu từ Blender
+HANDLERS = dict(temp_exporter.HANDLERS)
+HANDLERS.update(temp_keyframe_cleaner.HANDLERS)
+HANDLERS["run_command"] = run_command
+
+
+def run(scene):
+    # Xử lý mọi yêu cầu đang chờ (file trigger và message socket) trên thread của command
+    trigger_folder = commons.ensure_dir_exists(
+        os.path.join(commons.get_exchange_folder(), "cascadeur_triggers"))
+    count = trigger_queue.drain(scene, trigger_folder, HANDLERS)
+    
+    if count:
+        scene.info(f"Processed {count} requests from Blender.")
+    else:
+        scene.info("No pending requests from Blender.")
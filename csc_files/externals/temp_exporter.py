@@ -1,202 +1,82 @@
 import csc
 import os
-import json
 import time
-import tempfile
+
+from . import commons, trigger_queue, temp_importer, batch_export
 
 
 def command_name():
     return "B2C.Temp Exporter"
 
 
-def run(scene):
-    # Cấu hình
+def get_export_folders():
+    """Thư mục trigger cho Blender và thư mục FBX trong exchange folder"""
+    exchange_folder = commons.get_exchange_folder()
+    blender_trigger_folder = commons.ensure_dir_exists(os.path.join(exchange_folder, "blender_triggers"))
+    fbx_folder = commons.ensure_dir_exists(os.path.join(exchange_folder, "fbx"))
+    return blender_trigger_folder, fbx_folder
+
+
+def export_current_scene(scene, triggers, session):
+    # Nhiều yêu cầu liên tiếp chỉ cần export một lần
+    blender_trigger_folder, fbx_folder = get_export_folders()
+    current_time = time.strftime("%Y%m%d%H%M%S")
+    fbx_path = os.path.join(fbx_folder, f"cascadeur_to_blender_{current_time}.fbx")
+    
     try:
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.cfg")
-        import configparser
-        config = configparser.ConfigParser()
-        config.read(config_path)
+        commons.get_fbx_scene_loader(session).export_all_objects(fbx_path)
+        scene.info(f"Exported current scene to {fbx_path}")
         
-        exchange_folder = config.get("Addon Settings", "exchange_folder", fallback=tempfile.gettempdir())
-    except:
-        # Fallback to temp dir
-        exchange_folder = tempfile.gettempdir()
-    
-    # Đảm bảo thư mục tồn tại
-    if not os.path.exists(exchange_folder):
-        os.makedirs(exchange_folder)
+        # Tạo trigger cho Blender (ghi nguyên tử)
+        commons.write_reply(session, blender_trigger_folder, "import_scene", triggers, {
+            "fbx_path": fbx_path
+        })
+    except Exception as e:
+        # drain báo lỗi cho Blender qua request_done
+        raise RuntimeError(f"Failed to export scene: {str(e)}") from e
+
+
+def export_all_scenes(scene, triggers, session):
+    # Nhiều yêu cầu liên tiếp chỉ cần export một lần
+    blender_trigger_folder, fbx_folder = get_export_folders()
     
-    # Thư mục trigger cho Blender
-    blender_trigger_folder = os.path.join(exchange_folder, "blender_triggers")
-    if not os.path.exists(blender_trigger_folder):
-        os.makedirs(blender_trigger_folder)
+    try:
+        mp = csc.app.get_application()
+        scene_manager = mp.get_scene_manager()
+        
+        # FbxSceneLoader lấy một lần, các scene có thể export song song (export_workers)
+        data = batch_export.run_batch(scene_manager.scenes(), session, fbx_folder,
+                                      commons.get_export_workers(), log=scene.info)
+        if data["results"] and not data["fbx_paths"]:
+            raise RuntimeError("no scene could be exported")
+        
+        # Một trigger cho Blender với kết quả và thời gian của từng scene (ghi nguyên tử)
+        commons.write_reply(session, blender_trigger_folder, "import_all_scenes", triggers, data)
+    except Exception as e:
+        # drain báo lỗi cho Blender qua request_done
+        raise RuntimeError(f"Failed to export all scenes: {str(e)}") from e
 
-    # Thư mục cho FBX
-    fbx_folder = os.path.join(exchange_folder, "fbx")
-    if not os.path.exists(fbx_folder):
-        os.makedirs(fbx_folder)
 
-    # Lấy đường dẫn tạm cho export
-    current_time = time.strftime("%Y%m%d%H%M%S")
-    fbx_path = os.path.join(fbx_folder, f"cascadeur_to_blender_{current_time}.fbx")
+# Action -> handler(scene, triggers, session)
+HANDLERS = dict(temp_importer.HANDLERS)
+HANDLERS.update({
+    "export_current_scene": export_current_scene,
+    "export_all_scenes": export_all_scenes,
+})
 
-    # Kiểm tra xem có thư mục cascadeur_triggers
-    cascade_trigger_folder = os.path.join(exchange_folder, "cascadeur_triggers")
-    if not os.path.exists(cascade_trigger_folder):
-        os.makedirs(cascade_trigger_folder)
 
-    # Kiểm tra xem có file trigger mới không
-    newest_trigger = None
-    newest_time = 0
+def run(scene):
+    # Cấu hình
+    exchange_folder = commons.get_exchange_folder()
     
-    for filename in os.listdir(cascade_trigger_folder):
-        if filename.startswith("trigger_") and filename.endswith(".json"):
-            filepath = os.path.join(cascade_trigger_folder, filename)
-            mtime = os.path.getmtime(filepath)
-            if mtime > newest_time:
-                newest_time = mtime
-                newest_trigger = filepath
+    # Kiểm tra xem có thư mục cascadeur_triggers
+    cascade_trigger_folder = os.path.join(exchange_folder, "cascadeur_triggers")
+    commons.ensure_dir_exists(cascade_trigger_folder)
     
-    if newest_trigger:
-        try:
-            # Đọc file trigger
-            with open(newest_trigger, 'r') as f:
-                trigger_data = json.load(f)
-            
-            # Đánh dấu file trigger đã được xử lý
-            processed_path = newest_trigger + ".processed"
-            os.rename(newest_trigger, processed_path)
-            
-            # Lấy action
-            action = trigger_data.get("action", "")
-            
-            # Lấy app và scene hiện tại
-            mp = csc.app.get_application()
-            scene_pr = mp.get_scene_manager().current_scene()
-            tools_manager = mp.get_tools_manager()
-            
-            # Lấy FbxSceneLoader
-            fbx_scene_loader_tool = tools_manager.get_tool("FbxSceneLoader")
-            fbx_scene_loader = fbx_scene_loader_tool.get_fbx_loader(scene_pr)
-            
-            # Xử lý các action khác nhau
-            if action == "export_current_scene":
-                # Export scene hiện tại
-                try:
-                    fbx_scene_loader.export_all_objects(fbx_path)
-                    scene.info(f"Exported current scene to {fbx_path}")
-                    
-                    # Tạo trigger cho Blender
-                    trigger_data = {
-                        "action": "import_scene",
-                        "data": {
-                            "fbx_path": fbx_path
-                        }
-                    }
-                    
-                    # Ghi file trigger
-                    trigger_path = os.path.join(blender_trigger_folder, f"trigger_import_scene_{current_time}.json")
-                    with open(trigger_path, 'w') as f:
-                        json.dump(trigger_data, f, indent=2)
-                except Exception as e:
-                    scene.error(f"Failed to export scene: {str(e)}")
-            
-            elif action == "export_all_scenes":
-                # Export tất cả scene
-                try:
-                    scene_manager = mp.get_scene_manager()
-                    scenes = scene_manager.scenes()
-                    fbx_paths = []
-                    
-                    for i, s in enumerate(scenes):
-                        fbx_path_i = fbx_path.replace(".fbx", f"_scene{i}.fbx")
-                        fbx_loader = tools_manager.get_tool("FbxSceneLoader").get_fbx_loader(s)
-                        fbx_loader.export_all_objects(fbx_path_i)
-                        fbx_paths.append(fbx_path_i)
-                        scene.info(f"Exported scene {i} to {fbx_path_i}")
-                    
-                    # Tạo trigger cho Blender
-                    trigger_data = {
-                        "action": "import_all_scenes",
-                        "data": {
-                            "fbx_paths": fbx_paths
-                        }
-                    }
-                    
-                    # Ghi file trigger
-                    trigger_path = os.path.join(blender_trigger_folder, f"trigger_import_all_scenes_{current_time}.json")
-                    with open(trigger_path, 'w') as f:
-                        json.dump(trigger_data, f, indent=2)
-                except Exception as e:
-                    scene.error(f"Failed to export all scenes: {str(e)}")
-            
-            elif action == "import_fbx":
-                # Import FBX từ Blender
-                try:
-                    fbx_path = trigger_data.get("data", {}).get("fbx_path", "")
-                    if fbx_path and os.path.exists(fbx_path):
-                        fbx_scene_loader.import_model(fbx_path)
-                        scene.info(f"Imported FBX from {fbx_path}")
-                    else:
-                        scene.error(f"FBX file not found: {fbx_path}")
-                except Exception as e:
-                    scene.error(f"Failed to import FBX: {str(e)}")
-            
-            elif action == "import_object":
-                # Import object từ Blender
-                try:
-                    fbx_path = trigger_data.get("data", {}).get("fbx_path", "")
-                    if fbx_path and os.path.exists(fbx_path):
-                        fbx_scene_loader.import_model(fbx_path)
-                        scene.info(f"Imported object from {fbx_path}")
-                    else:
-                        scene.error(f"FBX file not found: {fbx_path}")
-                except Exception as e:
-                    scene.error(f"Failed to import object: {str(e)}")
-            
-            elif action == "import_animation":
-                # Import animation từ Blender
-                try:
-                    fbx_path = trigger_data.get("data", {}).get("fbx_path", "")
-                    json_path = trigger_data.get("data", {}).get("json_path", "")
-                    
-                    if fbx_path and os.path.exists(fbx_path):
-                        # Import FBX trước
-                        fbx_scene_loader.import_animation(fbx_path)
-                        scene.info(f"Imported animation from {fbx_path}")
-                        
-                        # Nếu có JSON, xử lý keyframes
-                        if json_path and os.path.exists(json_path):
-                            with open(json_path, 'r') as f:
-                                keyframes_data = json.load(f)
-                            
-                            # Xử lý keyframes (thêm code xử lý keyframes dựa trên API của Cascadeur)
-                            scene.info(f"Processed keyframes from {json_path}")
-                    else:
-                        scene.error(f"FBX file not found: {fbx_path}")
-                except Exception as e:
-                    scene.error(f"Failed to import animation: {str(e)}")
-            
-            elif action == "import_json":
-                # Import JSON từ Blender
-                try:
-                    json_path = trigger_data.get("data", {}).get("json_path", "")
-                    if json_path and os.path.exists(json_path):
-                        with open(json_path, 'r') as f:
-                            keyframes_data = json.load(f)
-                        
-                        # Xử lý keyframes (thêm code xử lý keyframes dựa trên API của Cascadeur)
-                        scene.info(f"Processed keyframes from {json_path}")
-                    else:
-                        scene.error(f"JSON file not found: {json_path}")
-                except Exception as e:
-                    scene.error(f"Failed to import JSON: {str(e)}")
-            
-            else:
-                scene.info(f"Unknown action: {action}")
-        
-        except Exception as e:
-            scene.error(f"Error processing trigger file: {str(e)}")
+    # Xử lý tất cả trigger đang chờ theo thứ tự
+    count = trigger_queue.drain(scene, cascade_trigger_folder, HANDLERS)
     
+    if count:
+        scene.info(f"Processed {count} trigger files.")
     else:
-        scene.info("No new trigger files found.")
\ No newline at end of file
+        scene.info("No new trigger files found.")
@@ -1,30 +1,47 @@
 import csc
 import os
-import json
-import time
-import tempfile
-import configparser
+
+from . import commons, trigger_queue
 
 
 def command_name():
     return "B2C.Temp Keyframe Cleaner"
 
 
+def clean_keyframes(scene, triggers, session):
+    # Xử lý lần lượt từng yêu cầu theo thứ tự
+    for trigger_data in triggers:
+        # Lấy dữ liệu keyframe
+        data = trigger_data.get("data", {})
+        if "keyframes" not in data and isinstance(data.get("data"), dict):
+            # Blender add-on gửi payload lồng trong "data"
+            data = data["data"]
+        keyframes = data.get("keyframes", {})
+        
+        # Chuyển đổi các key từ string về integer
+        marked_frames = [int(frame) for frame in keyframes.keys()]
+        
+        if not marked_frames:
+            scene.error("No marked keyframes received")
+            continue
+        
+        # Thông báo số lượng keyframe được đánh dấu
+        scene.info(f"Received {len(marked_frames)} marked keyframes: {', '.join(str(f) for f in sorted(marked_frames)[:10])}{', ...' if len(marked_frames) > 10 else ''}")
+        
+        # Xử lý keyframe
+        removed_count = keep_only_marked_keyframes(scene, marked_frames)
+        scene.info(f"Keyframe cleaning completed. Removed {removed_count} keyframes. Kept {len(marked_frames)} marked keyframes.")
+
+
+# Action -> handler(scene, triggers, session)
+HANDLERS = {
+    "clean_keyframes": clean_keyframes,
+}
+
+
 def run(scene):
     # Đọc cấu hình
-    try:
-        config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "settings.cfg")
-        config = configparser.ConfigParser()
-        config.read(config_path)
-        
-        exchange_folder = config.get("Addon Settings", "exchange_folder", fallback=tempfile.gettempdir())
-    except:
-        # Fallback to temp dir
-        exchange_folder = tempfile.gettempdir()
-    
-    # Đảm bảo thư mục tồn tại
-    if not os.path.exists(exchange_folder):
-        os.makedirs(exchange_folder)
+    exchange_folder = commons.get_exchange_folder()
     
     # Kiểm tra xem có thư mục cascadeur_triggers
     trigger_folder = os.path.join(exchange_folder, "cascadeur_triggers")
@@ -32,77 +49,93 @@ def run(scene):
         os.makedirs(trigger_folder)
         scene.info("Created triggers folder: " + trigger_folder)
         return
-
-    # Tìm trigger file mới nhất
-    newest_trigger = None
-    newest_time = 0
-    
-    for filename in os.listdir(trigger_folder):
-        if filename.startswith("trigger_clean_keyframes_") and filename.endswith(".json"):
-            filepath = os.path.join(trigger_folder, filename)
-            mtime = os.path.getmtime(filepath)
-            if mtime > newest_time:
-                newest_time = mtime
-                newest_trigger = filepath
     
-    if newest_trigger:
-        try:
-            # Đọc file trigger
-            with open(newest_trigger, 'r') as f:
-                trigger_data = json.load(f)
-            
-            # Đánh dấu file trigger đã được xử lý
-            processed_path = newest_trigger + ".processed"
-            os.rename(newest_trigger, processed_path)
-            
-            # Lấy dữ liệu keyframe
-            data = trigger_data.get("data", {})
-            keyframes = data.get("keyframes", {})
-            
-            # Chuyển đổi các key từ string về integer
-            marked_frames = [int(frame) for frame in keyframes.keys()]
-            
-            if not marked_frames:
-                scene.error("No marked keyframes received")
-                return
-            
-            # Thông báo số lượng keyframe được đánh dấu
-            scene.info(f"Received {len(marked_frames)} marked keyframes: {', '.join(str(f) for f in sorted(marked_frames)[:10])}{', ...' if len(marked_frames) > 10 else ''}")
-            
-            # Xử lý keyframe
-            removed_count = keep_only_marked_keyframes(scene, marked_frames)
-            scene.info(f"Keyframe cleaning completed. Removed {removed_count} keyframes. Kept {len(marked_frames)} marked keyframes.")
-            
-        except Exception as e:
-            scene.error(f"Error processing trigger file: {str(e)}")
-    else:
+    # Xử lý tất cả yêu cầu clean đang chờ theo thứ tự
+    count = trigger_queue.drain(scene, trigger_folder, HANDLERS, prefix="trigger_clean_keyframes_")
+    if not count:
         scene.info("No new trigger files found.")
 
 
+def unmarked_intervals(marked_frames, max_frame):
+    """Các khoảng (start, end) trong [0, max_frame] không chứa frame được đánh dấu"""
+    start = 0
+    for frame in sorted(set(marked_frames)):
+        if frame < start:
+            continue
+        if frame > max_frame:
+            break
+        if frame > start:
+            yield start, frame - 1
+        start = frame + 1
+    if start <= max_frame:
+        yield start, max_frame
+
+
+def section_frames(lv, layer_id):
+    """Sorted frames that hold a section on a layer, or None if the API can't tell"""
+    try:
+        layer = lv.layer(layer_id)
+        frames = layer.key_frame_indices()
+        return sorted(frames)
+    except Exception:
+        return None
+
+
+def frames_in_intervals(frames, intervals):
+    """Frames (sorted) that fall inside any of the sorted intervals"""
+    intervals = list(intervals)
+    i = 0
+    for frame in frames:
+        while i < len(intervals) and intervals[i][1] < frame:
+            i += 1
+        if i == len(intervals):
+            break
+        if intervals[i][0] <= frame:
+            yield frame
+
+
 def keep_only_marked_keyframes(scene, marked_frames):
     """Xóa tất cả keyframe không được đánh dấu trong các layer"""
     lv = scene.layers_viewer()
     removed_count = 0
+    removed_per_layer = {}
     
     def mod(model, update, scene):
         nonlocal removed_count
         le = model.layers_editor()
         all_layer_ids = lv.all_layer_ids()
+        if not all_layer_ids:
+            return
+        
+        # Lấy frames_count một lần cho tất cả layer
+        max_frame = lv.frames_count(all_layer_ids)
+        intervals = list(unmarked_intervals(marked_frames, max_frame))
         
         for layer_id in all_layer_ids:
-            # Lấy frames_count để biết số lượng frame tối đa
-            max_frame = lv.frames_count([layer_id])
+            held = section_frames(lv, layer_id)
+            if held is not None:
+                # Chỉ xóa các frame thực sự có section
+                candidates = frames_in_intervals(held, intervals)
+            else:
+                # API không cho biết section, duyệt các khoảng không đánh dấu
+                candidates = (frame for start, end in intervals for frame in range(start, end + 1))
+            
+            layer_removed = 0
+            for frame in candidates:
+                try:
+                    le.unset_section(frame, layer_id)
+                    layer_removed += 1
+                except Exception:
+                    # Frame không có section
+                    pass
             
-            # Xóa các frame không nằm trong danh sách đánh dấu
-            for frame in range(0, max_frame + 1):
-                if frame not in marked_frames:
-                    try:
-                        # Chỉ xóa khi frame không nằm trong danh sách đánh dấu
-                        le.unset_section(frame, layer_id)
-                        removed_count += 1
-                    except Exception as e:
-                        # Bỏ qua lỗi - có thể frame không có section
-                        pass
+            if layer_removed:
+                removed_per_layer[layer_id] = layer_removed
+            removed_count += layer_removed
     
     scene.modify('Keep only marked keyframes', mod)
+    
+    for layer_id, count in removed_per_layer.items():
+        scene.info(f"Layer {layer_id}: removed {count} keyframes")
+    
     return removed_count
\ No newline at end of file
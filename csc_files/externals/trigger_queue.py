@@ -0,0 +1,199 @@
+import os
+import json
+
+from . import commons, socket_listener
+
+
+def pending_triggers(folder, prefix="trigger_"):
+    """
+    Trigger files waiting in a folder, oldest first.
+    
+    Args:
+        folder: Trigger folder
+        prefix: Only consider files starting with this prefix
+    
+    Returns:
+        List of trigger file paths in write order
+    """
+    if not os.path.exists(folder):
+        return []
+    
+    paths = [os.path.join(folder, filename) for filename in os.listdir(folder)
+             if filename.startswith(prefix) and filename.endswith(".json")]
+    paths.sort(key=commons.trigger_sort_key)
+    return paths
+
+
+def claim_trigger(trigger_path):
+    """
+    Mark a trigger as processed so no other command picks it up.
+    
+    Returns:
+        True if this call claimed the trigger
+    """
+    try:
+        os.rename(trigger_path, trigger_path + ".processed")
+        return True
+    except OSError:
+        return False
+
+
+def trigger_action(trigger_path):
+    """
+    Action of a trigger file, from its name when it has the sequence naming.
+    
+    Returns:
+        Action name, "" if the file cannot be read
+    """
+    match = commons.TRIGGER_NAME_PATTERN.match(os.path.basename(trigger_path))
+    if match:
+        return match.group("action")
+    try:
+        with open(trigger_path, 'r') as f:
+            return json.load(f).get("action", "")
+    except (OSError, ValueError, AttributeError):
+        return ""
+
+
+def has_pending(folder, handlers, prefix="trigger_"):
+    """True if a trigger for one of the handlers waits in folder"""
+    return any(trigger_action(path) in handlers for path in pending_triggers(folder, prefix))
+
+
+def claim_batch(scene, folder, handlers, prefix="trigger_"):
+    """
+    Read and claim every pending trigger with a known action.
+    
+    Returns:
+        List of trigger dictionaries in write order
+    """
+    batch = []
+    for trigger_path in pending_triggers(folder, prefix):
+        try:
+            with open(trigger_path, 'r') as f:
+                trigger_data = json.load(f)
+        except (OSError, ValueError) as e:
+            scene.error(f"Error reading trigger file {trigger_path}: {str(e)}")
+            claim_trigger(trigger_path)
+            continue
+        
+        if trigger_data.get("action", "") not in handlers:
+            continue
+        if claim_trigger(trigger_path):
+            batch.append(trigger_data)
+    return batch
+
+
+def group_consecutive(triggers):
+    """
+    Group consecutive triggers that share an action.
+    
+    Args:
+        triggers: List of trigger dictionaries in order
+    
+    Returns:
+        List of (action, [trigger, ...]) tuples, order preserved
+    """
+    groups = []
+    for trigger in triggers:
+        action = trigger.get("action", "")
+        if groups and groups[-1][0] == action:
+            groups[-1][1].append(trigger)
+        else:
+            groups.append((action, [trigger]))
+    return groups
+
+
+def reply_done(session, folder, action, triggers, error=None):
+    """
+    Tell Blender that a group of requests has been handled.
+    
+    Args:
+        session: Dictionary shared by the handlers of one command run
+        folder: Cascadeur trigger folder (replies go to its sibling blender_triggers)
+        action: Action of the handled triggers
+        triggers: Handled trigger dictionaries
+        error: Error message, None on success
+    """
+    blender_trigger_folder = os.path.join(os.path.dirname(folder), "blender_triggers")
+    data = {"action": action}
+    if error:
+        data["error"] = error
+    try:
+        commons.write_reply(session, blender_trigger_folder, "request_done", triggers, data)
+    except OSError as e:
+        print(f"Error writing request_done trigger: {e}")
+
+
+def drain(scene, folder, handlers, prefix="trigger_"):
+    """
+    Process every pending trigger with a known action, in order.
+    
+    Messages received by the socket listener are written to the folder
+    as trigger files, so files are the only source of requests.
+    Triggers whose action has no handler are left for other commands.
+    Requests a handler did not answer itself (commons.write_reply) get a
+    "request_done" trigger back to Blender carrying their request ids and
+    any error.
+    Consecutive triggers with the same action are passed to their handler
+    together as handler(scene, triggers, session); session is a dict
+    shared by all handlers of this drain, used to resolve tools once.
+    
+    Args:
+        scene: Cascadeur scene passed to the command
+        folder: Trigger folder
+        handlers: Dictionary action -> handler
+        prefix: Only consider files starting with this prefix
+    
+    Returns:
+        Number of triggers processed
+    """
+    session = {}
+    processed = 0
+    
+    # Start the listener so Blender can send the next requests over the socket;
+    # its thread only writes them as trigger files, they are handled here on the command's thread
+    listener = None
+    port = commons.get_socket_port()
+    if port:
+        listener = socket_listener.ensure_listener(port, folder)
+    # While registered, Blender does not launch a command for requests this drain handles
+    token = listener.begin_drain(prefix, handlers) if listener else None
+    
+    try:
+        while True:
+            batch = claim_batch(scene, folder, handlers, prefix)
+            
+            # Triggers that arrived while a batch was handled are drained too
+            if not batch:
+                if token is None or listener.end_drain(token, lambda: has_pending(folder, handlers, prefix)):
+                    token = None
+                    break
+                continue
+            
+            processed += _handle_batch(scene, folder, handlers, batch, session)
+    finally:
+        if token is not None:
+            listener.end_drain(token)
+    
+    return processed
+
+
+def _handle_batch(scene, folder, handlers, batch, session):
+    """Run the handlers of a claimed batch, returns the number of triggers"""
+    processed = 0
+    for action, triggers in group_consecutive(batch):
+        error = None
+        try:
+            handlers[action](scene, triggers, session)
+        except Exception as e:
+            error = str(e)
+            scene.error(f"Error processing {action}: {error}")
+        processed += len(triggers)
+        
+        replied = session.get("replied", set())
+        unanswered = [t for t in triggers if t.get("request_id") and t["request_id"] not in replied]
+        if unanswered:
+            reply_done(session, folder, action, unanswered, error)
+    
+    return processed
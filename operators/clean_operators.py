@@ -1,7 +1,10 @@
 import bpy
 import os
 import json
+import time
 from bpy.types import Operator
+from bpy.props import FloatProperty
+from ..utils import fcurve_clean, timeline_utils
 
 # Clean Keyframes trong Blender
 class BTC_OT_CleanKeyframes(Operator):
@@ -34,43 +37,24 @@ class BTC_OT_CleanKeyframes(Operator):
         return {'FINISHED'}
     
     def get_marked_keyframes(self, context):
-        # Lấy danh sách keyframe từ metadata
-        marked_frames = []
-        
-        # Nếu có danh sách keyframe đã đánh dấu từ UI
-        if hasattr(context.scene, "btc_keyframes"):
-            for item in context.scene.btc_keyframes:
-                if item.is_marked:
-                    marked_frames.append(item.frame)
-        
-        return marked_frames
+        # Lấy danh sách keyframe đã đánh dấu từ UI
+        return timeline_utils.get_marked_frames(context.scene)
     
     def clean_keyframes(self, armature, marked_keyframes):
         # Lưu frame hiện tại
         current_frame = bpy.context.scene.frame_current
         
         action = armature.animation_data.action
-        fcurves = action.fcurves
         
-        removed_count = 0
+        # Đọc và ghi lại từng fcurve bằng foreach_get/foreach_set
+        removed_count, timings = fcurve_clean.clean_action(action, marked_keyframes)
+        fcurve_clean.print_timings(timings)
         
-        # Lặp qua từng fcurve và xóa các keyframe không được đánh dấu
-        for fcurve in fcurves:
-            # Lặp qua từng keyframe trong fcurve theo thứ tự ngược lại
-            # vì chúng ta sẽ xóa một số keyframe
-            keyframe_points = fcurve.keyframe_points
-            i = len(keyframe_points) - 1
-            
-            while i >= 0:
-                keyframe = keyframe_points[i]
-                frame = int(keyframe.co[0])
-                
-                # Nếu frame không nằm trong danh sách được đánh dấu, xóa nó
-                if frame not in marked_keyframes:
-                    keyframe_points.remove(keyframe)
-                    removed_count += 1
-                
-                i -= 1
+        if timings:
+            total_ms = sum(t[2] for t in timings)
+            slowest = max(timings, key=lambda t: t[2])
+            self.report({'INFO'}, f"Cleaned {len(timings)} fcurves in {total_ms:.1f} ms "
+                                  f"(slowest {slowest[0]}: {slowest[2]:.2f} ms)")
         
         # Cập nhật animation để áp dụng các thay đổi
         action.fcurves.update()
@@ -80,6 +64,140 @@ class BTC_OT_CleanKeyframes(Operator):
         
         return removed_count
 
+# Clean Keyframes trong Blender, chạy theo từng đợt với timer
+class BTC_OT_CleanKeyframesModal(Operator):
+    bl_idname = "btc.clean_keyframes_modal"
+    bl_label = "Clean Keyframes (Interactive)"
+    bl_description = "Remove all unmarked keyframes in small time slices with progress. Press Esc to cancel"
+    bl_options = {'REGISTER', 'UNDO'}
+    
+    time_budget_ms: FloatProperty(
+        name="Time Budget (ms)",
+        description="Maximum time spent cleaning per timer tick",
+        default=8.0,
+        min=1.0,
+        max=100.0
+    )
+    
+    _timer = None
+    
+    @classmethod
+    def poll(cls, context):
+        return BTC_OT_CleanKeyframes.poll(context)
+    
+    def setup(self, context):
+        """Chuẩn bị trạng thái, trả về False nếu không có keyframe đánh dấu"""
+        marked_keyframes = timeline_utils.get_marked_frames(context.scene)
+        if not marked_keyframes:
+            return False
+        
+        self._action = context.active_object.animation_data.action
+        self._marked = fcurve_clean.marked_frames_array(marked_keyframes)
+        self._marked_count = len(marked_keyframes)
+        # Fcurves are found by channel, a cleaned fcurve may be recreated at the end
+        self._keys = fcurve_clean.fcurve_keys(self._action)
+        self._fcurve_count = len(self._keys)
+        self._next_index = 0
+        self._removed_count = 0
+        self._timings = []
+        # (fcurve key, original arrays) for rollback on cancel
+        self._originals = []
+        self._current_frame = context.scene.frame_current
+        return True
+    
+    def step(self, budget_seconds=None):
+        """Clean fcurves until the budget is used up. Returns True when done."""
+        deadline = time.perf_counter() + budget_seconds if budget_seconds is not None else None
+        while self._next_index < self._fcurve_count:
+            key = self._keys[self._next_index]
+            fcurve = fcurve_clean.find_fcurve(self._action, key)
+            # Trước khi clean: fcurve có thể bị tạo lại (Blender không có keyframe_points.clear)
+            label = fcurve_clean.fcurve_label(fcurve)
+            start = time.perf_counter()
+            removed, original = fcurve_clean.clean_fcurve(fcurve, self._marked)
+            elapsed = (time.perf_counter() - start) * 1000.0
+            
+            if original is not None:
+                self._originals.append((key, original))
+            self._removed_count += removed
+            self._timings.append((label, removed, elapsed))
+            self._next_index += 1
+            
+            if deadline is not None and time.perf_counter() >= deadline:
+                break
+        
+        return self._next_index >= self._fcurve_count
+    
+    def finish(self, context):
+        # Same final steps as BTC_OT_CleanKeyframes.clean_keyframes
+        self._action.fcurves.update()
+        context.scene.frame_current = self._current_frame
+        fcurve_clean.print_timings(self._timings)
+        self.report({'INFO'}, f"Cleaned keyframes. Kept {self._marked_count} marked keyframes, removed {self._removed_count} keyframes")
+    
+    def rollback(self, context):
+        for key, original in reversed(self._originals):
+            fcurve_clean.restore_fcurve(fcurve_clean.find_fcurve(self._action, key), original)
+        self._originals = []
+        self._action.fcurves.update()
+        context.scene.frame_current = self._current_frame
+    
+    def stop_timer(self, context):
+        wm = context.window_manager
+        if self._timer is not None:
+            wm.event_timer_remove(self._timer)
+            self._timer = None
+        wm.progress_end()
+    
+    def execute(self, context):
+        # Chạy không qua modal (ví dụ từ script): xử lý tất cả trong một lần
+        if not self.setup(context):
+            self.report({'WARNING'}, "No marked keyframes found in metadata")
+            return {'CANCELLED'}
+        
+        self.step()
+        self.finish(context)
+        return {'FINISHED'}
+    
+    def invoke(self, context, event):
+        if not self.setup(context):
+            self.report({'WARNING'}, "No marked keyframes found in metadata")
+            return {'CANCELLED'}
+        
+        wm = context.window_manager
+        wm.progress_begin(0, max(self._fcurve_count, 1))
+        self._timer = wm.event_timer_add(0.01, window=context.window)
+        wm.modal_handler_add(self)
+        return {'RUNNING_MODAL'}
+    
+    def modal(self, context, event):
+        if event.type == 'ESC':
+            self.stop_timer(context)
+            self.rollback(context)
+            self.report({'WARNING'}, "Clean keyframes cancelled, all changes were rolled back")
+            return {'CANCELLED'}
+        
+        if event.type != 'TIMER':
+            # Chặn các thao tác khác để action không bị sửa giữa chừng
+            return {'RUNNING_MODAL'}
+        
+        try:
+            done = self.step(self.time_budget_ms / 1000.0)
+        except Exception as e:
+            self.stop_timer(context)
+            self.rollback(context)
+            self.report({'ERROR'}, f"Clean keyframes failed and was rolled back: {str(e)}")
+            return {'CANCELLED'}
+        
+        context.window_manager.progress_update(self._next_index)
+        
+        if done:
+            self.stop_timer(context)
+            self.finish(context)
+            return {'FINISHED'}
+        
+        return {'RUNNING_MODAL'}
+
 # Clean Keyframes trong Cascadeur
 class BTC_OT_CleanKeyframesCascadeur(Operator):
     bl_idname = "btc.clean_keyframes_cascadeur"
@@ -119,6 +237,7 @@ class BTC_OT_CleanKeyframesCascadeur(Operator):
         }
         
         try:
+            # File trigger: command được chạy bằng một lần launch Cascadeur mới
             trigger_path = file_utils.create_trigger_file(exchange_folder, "clean_keyframes", trigger_data)
             if not trigger_path:
                 self.report({'ERROR'}, "Failed to create trigger file")
@@ -142,5 +261,6 @@ class BTC_OT_CleanKeyframesCascadeur(Operator):
 # Danh sách các lớp để đăng ký
 classes = [
     BTC_OT_CleanKeyframes,
+    BTC_OT_CleanKeyframesModal,
     BTC_OT_CleanKeyframesCascadeur,
 ]
\ No newline at end of file
@@ -114,19 +114,22 @@ class BTC_OT_InstallCascadeurAddon(bpy.types.Operator):
                 return {'CANCELLED'}
             
             # Cập nhật file settings.cfg với đường dẫn exchange folder
+            # (add-on gửi kèm mẫu setting.cfg, Cascadeur đọc settings.cfg)
             settings_file = os.path.join(target_dir, "settings.cfg")
-            if os.path.exists(settings_file):
+            template_file = os.path.join(target_dir, "setting.cfg")
+            if os.path.exists(settings_file) or os.path.exists(template_file):
                 exchange_folder = preferences.get_exchange_folder(context)
                 
                 config = configparser.ConfigParser()
-                config.read(settings_file)
+                config.read([template_file, settings_file])
                 
                 if not config.has_section("Addon Settings"):
                     config.add_section("Addon Settings")
                 
-                # Đặt cổng và thư mục trao đổi
-                port = preferences.get_port_number()
-                config.set("Addon Settings", "port", str(port))
+                # Đặt cổng và thư mục trao đổi; Cascadeur chỉ mở socket khi Blender dùng nó
+                port = preferences.get_socket_port(context)
+                config.set("Addon Settings", "use_socket_transport", str(bool(port)))
+                config.set("Addon Settings", "port", str(port or preferences.get_port_number()))
                 config.set("Addon Settings", "exchange_folder", exchange_folder)
                 
                 try:
@@ -4,8 +4,8 @@ import os
 import time
 import tempfile
 from bpy.types import Operator
-from bpy.props import StringProperty
-from ..utils import file_utils, preferences, timeline_utils
+from bpy.props import StringProperty, BoolProperty
+from ..utils import file_utils, preferences, socket_transport, timeline_utils, exchange_store, file_watcher
 
 # Export Object
 class BTC_OT_ExportObject(Operator):
@@ -14,6 +14,25 @@ class BTC_OT_ExportObject(Operator):
     bl_description = "Export selected object to Cascadeur"
     bl_options = {'REGISTER', 'UNDO'}
     
+    # FBX exporter settings, also part of the change fingerprint.
+    # NLA strips and all actions are exported as takes (exporter defaults),
+    # the fingerprint hashes them as well
+    FBX_SETTINGS = {
+        "use_selection": True,
+        "object_types": {'ARMATURE', 'MESH'},
+        "use_mesh_modifiers": True,
+        "use_mesh_modifiers_render": True,
+        "add_leaf_bones": False,
+        "bake_anim_use_nla_strips": True,
+        "bake_anim_use_all_actions": True,
+    }
+    
+    force: BoolProperty(
+        name="Force",
+        description="Export and send even if the armature and action did not change since the last export",
+        default=False
+    )
+    
     @classmethod
     def poll(cls, context):
         return context.scene.btc_armature is not None
@@ -29,34 +48,53 @@ class BTC_OT_ExportObject(Operator):
         prefs = preferences.get_preferences(context)
         exchange_folder = preferences.get_exchange_folder(context)
         
-        # Create export path
-        export_path = file_utils.get_export_path(file_type="fbx", use_temp=True)
+        direct_export = getattr(prefs, "direct_export", True) if prefs else True
+        
+        # Exports are stored by content hash, the manifest remembers the last one per armature
+        store = exchange_store.ExchangeStore(exchange_folder)
+        store_name = f"object/{armature.name}"
         
         try:
-            # Export FBX
-            if not self.export_fbx(context, export_path):
-                self.report({'ERROR'}, "Failed to export FBX")
-                return {'CANCELLED'}
-            
-            # Copy file to exchange folder
-            fbx_path = file_utils.copy_file_to_exchange(export_path, exchange_folder, "fbx")
-            if not fbx_path:
-                self.report({'ERROR'}, "Failed to copy FBX to exchange folder")
-                return {'CANCELLED'}
+            # Skip everything if the armature and action did not change since the last send
+            fingerprint = exchange_store.armature_fingerprint(armature, settings=self.FBX_SETTINGS,
+                                                             scene=context.scene, actions=bpy.data.actions)
+            entry = None if self.force else store.find_unchanged(store_name, fingerprint)
+            if entry and entry.get("sent"):
+                self.report({'INFO'}, f"{armature.name} unchanged since the last export, nothing to send")
+                return {'FINISHED'}
+            
+            if entry:
+                # Exported before but never delivered, reuse the stored file
+                fbx_path = entry["path"]
+            else:
+                if direct_export:
+                    # Export straight into the store, published by rename when complete
+                    export_path = store.staging_path(".fbx")
+                else:
+                    export_path = file_utils.get_export_path(file_type="fbx", use_temp=True)
+                
+                # Export FBX
+                if not self.export_fbx(context, export_path):
+                    if os.path.exists(export_path):
+                        os.remove(export_path)
+                    self.report({'ERROR'}, "Failed to export FBX")
+                    return {'CANCELLED'}
+                
+                # Move into the store (identical content is kept once)
+                fbx_path = store.put_file(export_path, store_name, fingerprint)
             
-            # Create trigger file
+            # Trigger data (send_request adds the action around it)
             trigger_data = {
-                "action": "import_object",
-                "data": {
-                    "fbx_path": fbx_path,
-                    "object_name": armature.name
-                }
+                "fbx_path": fbx_path,
+                "object_name": armature.name
             }
             
-            trigger_path = file_utils.create_trigger_file(exchange_folder, "import_object", trigger_data)
-            if not trigger_path:
-                self.report({'ERROR'}, "Failed to create trigger file")
+            request = file_watcher.send_request(context, "import_object", trigger_data)
+            if not request:
+                self.report({'ERROR'}, "Failed to send request to Cascadeur")
                 return {'CANCELLED'}
+            # Only Cascadeur's reply makes the entry "sent"; until then the next export sends it again
+            self.mark_sent_on_reply(request, store, store_name, store.lookup(store_name)["hash"])
             
             # Auto open Cascadeur if option enabled
             if prefs and hasattr(prefs, "auto_open_cascadeur") and prefs.auto_open_cascadeur:
@@ -69,6 +107,19 @@ class BTC_OT_ExportObject(Operator):
             self.report({'ERROR'}, f"Export error: {str(e)}")
             return {'CANCELLED'}
     
+    @staticmethod
+    def mark_sent_on_reply(request, store, store_name, content_hash):
+        """Mark the store entry sent once Cascadeur answers the request without error"""
+        def on_reply(future):
+            if future.cancelled() or future.exception() is not None:
+                return
+            # The future resolves on the watcher thread, write the manifest from the main thread
+            def mark_sent():
+                store.mark_sent(store_name, content_hash)
+                return None
+            bpy.app.timers.register(mark_sent)
+        request.future.add_done_callback(on_reply)
+    
     def export_fbx(self, context, filepath):
         """Export armature to FBX"""
         try:
@@ -82,14 +133,7 @@ class BTC_OT_ExportObject(Operator):
             context.view_layer.objects.active = context.scene.btc_armature
             
             # Export FBX
-            bpy.ops.export_scene.fbx(
-                filepath=filepath,
-                use_selection=True,
-                object_types={'ARMATURE', 'MESH'},
-                use_mesh_modifiers=True,
-                use_mesh_modifiers_render=True,
-                add_leaf_bones=False
-            )
+            bpy.ops.export_scene.fbx(filepath=filepath, **self.FBX_SETTINGS)
             
             # Restore selection
             bpy.ops.object.select_all(action='DESELECT')
@@ -404,7 +448,7 @@ class BTC_OT_ExportComplete(Operator):
             return {'CANCELLED'}
         
         try:
-            # Copy files to exchange folder
+            # Publish files in the exchange folder (reused in place, else reflink/hard link/copy)
             fbx_path = file_utils.copy_file_to_exchange(self.fbx_path, exchange_folder, "fbx")
             if not fbx_path:
                 self.report({'ERROR'}, "Failed to copy FBX to exchange folder")
@@ -425,16 +469,17 @@ class BTC_OT_ExportComplete(Operator):
                 }
             }
             
-            trigger_path = file_utils.create_trigger_file(exchange_folder, "import_animation", trigger_data)
-            if not trigger_path:
-                self.report({'ERROR'}, "Failed to create trigger file")
+            delivered = socket_transport.send_trigger(exchange_folder, "import_animation", trigger_data,
+                preferences.get_socket_port(context))
+            if not delivered:
+                self.report({'ERROR'}, "Failed to send request to Cascadeur")
                 return {'CANCELLED'}
             
             # Auto open Cascadeur if option enabled
             if prefs and hasattr(prefs, "auto_open_cascadeur") and prefs.auto_open_cascadeur:
                 bpy.ops.btc.open_cascadeur()
             
-            self.report({'INFO'}, f"Created trigger for Cascadeur at {trigger_path}")
+            self.report({'INFO'}, f"Sent export of {os.path.basename(fbx_path)} to Cascadeur")
             return {'FINISHED'}
             
         except Exception as e:
@@ -3,7 +3,7 @@ import os
 import json
 from bpy.types import Operator
 from bpy.props import StringProperty
-from ..utils import file_utils, preferences
+from ..utils import file_utils, preferences, socket_transport, file_watcher
 
 # Import FBX từ Cascadeur vào Blender
 class BTC_OT_ImportScene(Operator):
@@ -25,10 +25,11 @@ class BTC_OT_ImportScene(Operator):
             cascadeur_trigger_folder = os.path.join(exchange_folder, "cascadeur_triggers")
             file_utils.ensure_dir_exists(cascadeur_trigger_folder)
             
-            # Tạo file trigger
-            trigger_path = file_utils.create_trigger_file(exchange_folder, "export_current_scene", trigger_data)
-            if not trigger_path:
-                self.report({'ERROR'}, "Failed to create trigger file")
+            # Gửi trigger qua socket, hoặc tạo file trigger nếu không kết nối được
+            # Trả lời của Cascadeur được ghép với yêu cầu qua request_id
+            request = file_watcher.send_request(context, "export_current_scene", trigger_data)
+            if not request:
+                self.report({'ERROR'}, "Failed to send request to Cascadeur")
                 return {'CANCELLED'}
             
             # Tự động mở Cascadeur nếu đã bật tùy chọn
@@ -62,10 +63,11 @@ class BTC_OT_ImportAllScenes(Operator):
             cascadeur_trigger_folder = os.path.join(exchange_folder, "cascadeur_triggers")
             file_utils.ensure_dir_exists(cascadeur_trigger_folder)
             
-            # Tạo file trigger
-            trigger_path = file_utils.create_trigger_file(exchange_folder, "export_all_scenes", trigger_data)
-            if not trigger_path:
-                self.report({'ERROR'}, "Failed to create trigger file")
+            # Gửi trigger qua socket, hoặc tạo file trigger nếu không kết nối được
+            # Trả lời của Cascadeur được ghép với yêu cầu qua request_id
+            request = file_watcher.send_request(context, "export_all_scenes", trigger_data)
+            if not request:
+                self.report({'ERROR'}, "Failed to send request to Cascadeur")
                 return {'CANCELLED'}
             
             # Tự động mở Cascadeur nếu đã bật tùy chọn
@@ -113,7 +115,7 @@ class BTC_OT_ImportFBXToCascadeur(Operator):
             prefs = preferences.get_preferences(context)
             exchange_folder = preferences.get_exchange_folder(context)
             
-            # Sao chép file sang thư mục trao đổi
+            # Đưa file vào thư mục trao đổi (dùng luôn nếu đã ở đó, nếu không thì reflink/hard link/copy)
             fbx_path = file_utils.copy_file_to_exchange(self.filepath, exchange_folder, "fbx")
             if not fbx_path:
                 self.report({'ERROR'}, "Failed to copy FBX to exchange folder")
@@ -127,10 +129,11 @@ class BTC_OT_ImportFBXToCascadeur(Operator):
                 }
             }
             
-            # Tạo file trigger
-            trigger_path = file_utils.create_trigger_file(exchange_folder, "import_fbx", trigger_data)
-            if not trigger_path:
-                self.report({'ERROR'}, "Failed to create trigger file")
+            # Gửi trigger qua socket, hoặc tạo file trigger nếu không kết nối được
+            delivered = socket_transport.send_trigger(exchange_folder, "import_fbx", trigger_data,
+                preferences.get_socket_port(context))
+            if not delivered:
+                self.report({'ERROR'}, "Failed to send request to Cascadeur")
                 return {'CANCELLED'}
             
             # Tự động mở Cascadeur nếu đã bật tùy chọn
@@ -192,10 +195,11 @@ class BTC_OT_ImportJSONToCascadeur(Operator):
                 }
             }
             
-            # Tạo file trigger
-            trigger_path = file_utils.create_trigger_file(exchange_folder, "import_json", trigger_data)
-            if not trigger_path:
-                self.report({'ERROR'}, "Failed to create trigger file")
+            # Gửi trigger qua socket, hoặc tạo file trigger nếu không kết nối được
+            delivered = socket_transport.send_trigger(exchange_folder, "import_json", trigger_data,
+                preferences.get_socket_port(context))
+            if not delivered:
+                self.report({'ERROR'}, "Failed to send request to Cascadeur")
                 return {'CANCELLED'}
             
             # Tự động mở Cascadeur nếu đã bật tùy chọn
@@ -1,7 +1,7 @@
 import bpy
 from bpy.types import Operator, PropertyGroup, UIList
 from bpy.props import BoolProperty, IntProperty, StringProperty, EnumProperty
-from ..utils import timeline_utils
+from ..utils import timeline_utils, keyframe_scan
 
 # Define PropertyGroup for keyframe
 class KeyframeItem(PropertyGroup):
@@ -30,6 +30,67 @@ class KeyframeListFilter(PropertyGroup):
         default='ALL'
     )
 
+# Cached frame -> index lookup for btc_keyframes, one entry per scene.
+# Each entry is (collection length, {frame: index}); a length mismatch
+# or a stale hit rebuilds it, structural edits invalidate it explicitly.
+_keyframe_lookup = {}
+
+def invalidate_keyframe_lookup(scene=None):
+    """Forget the cached frame -> index map (of one scene, or of all scenes)"""
+    if scene is None:
+        _keyframe_lookup.clear()
+    else:
+        _keyframe_lookup.pop(scene.name, None)
+
+def _build_keyframe_lookup(scene):
+    frames, _ = keyframe_scan.read_keyframe_list(scene.btc_keyframes)
+    lookup = {}
+    for index, frame in enumerate(frames.tolist()):
+        # Keep the first item of a frame, like a linear scan would
+        lookup.setdefault(frame, index)
+    entry = (len(frames), lookup)
+    _keyframe_lookup[scene.name] = entry
+    return entry
+
+def find_keyframe_index(scene, frame):
+    """Return the index of frame in scene.btc_keyframes, or -1"""
+    keyframes = scene.btc_keyframes
+    entry = _keyframe_lookup.get(scene.name)
+    if entry is None or entry[0] != len(keyframes):
+        entry = _build_keyframe_lookup(scene)
+    
+    index = entry[1].get(frame, -1)
+    if index >= 0 and keyframes[index].frame != frame:
+        # Collection changed behind our back
+        index = _build_keyframe_lookup(scene)[1].get(frame, -1)
+    return index
+
+def find_keyframe_item(scene, frame):
+    """Return the btc_keyframes item for frame, or None"""
+    index = find_keyframe_index(scene, frame)
+    return scene.btc_keyframes[index] if index >= 0 else None
+
+def add_keyframe_item(scene, frame, is_marked=False):
+    """Append an item for frame to btc_keyframes and keep the lookup current"""
+    # Make sure the cache is valid before the collection grows
+    find_keyframe_index(scene, frame)
+    
+    keyframes = scene.btc_keyframes
+    item = keyframes.add()
+    item.frame = frame
+    
+    count, lookup = _keyframe_lookup[scene.name]
+    lookup.setdefault(frame, count)
+    _keyframe_lookup[scene.name] = (count + 1, lookup)
+    
+    item.is_marked = is_marked
+    return item
+
+@bpy.app.handlers.persistent
+def keyframe_lookup_reset_handler(*args):
+    """Undo, redo and file loads replace btc_keyframes, so forget the lookup"""
+    invalidate_keyframe_lookup()
+
 # Handle armature selection
 class BTC_OT_PickArmature(Operator):
     bl_idname = "btc.pick_armature"
@@ -52,30 +113,24 @@ class BTC_OT_PickArmature(Operator):
         return {'FINISHED'}
     
     def update_keyframe_list(self, context):
-        # Clear old list
-        context.scene.btc_keyframes.clear()
-        
-        # If no armature, return
-        if not context.scene.btc_armature:
-            return
-            
-        armature = context.scene.btc_armature
+        invalidate_keyframe_lookup(context.scene)
         
-        # Find all keyframes from armature
-        if armature.animation_data and armature.animation_data.action:
-            keyframes = set()
+        # Timeline markers are synced once when the batch ends
+        with timeline_utils.batch_mark_edits(context.scene):
+            # Clear old list
+            context.scene.btc_keyframes.clear()
             
-            for fcurve in armature.animation_data.action.fcurves:
-                for keyframe in fcurve.keyframe_points:
-                    # Add frame to set
-                    frame = int(keyframe.co[0])
-                    keyframes.add(frame)
+            # If no armature, return
+            if not context.scene.btc_armature:
+                return
+                
+            armature = context.scene.btc_armature
             
-            # Add keyframes to list
-            for frame in sorted(list(keyframes)):
-                item = context.scene.btc_keyframes.add()
-                item.frame = frame
-                item.is_marked = False  # Default is not marked
+            # Find all keyframes from armature in one bulk read
+            action = keyframe_scan.get_armature_action(armature)
+            if action:
+                frames = keyframe_scan.scan_action_frames(action)
+                keyframe_scan.fill_keyframe_list(context.scene, frames)
 
 # Mark current keyframe
 class BTC_OT_MarkCurrentKeyframe(Operator):
@@ -92,21 +147,16 @@ class BTC_OT_MarkCurrentKeyframe(Operator):
         current_frame = context.scene.frame_current
         
         # Check if keyframe exists in list
-        for item in context.scene.btc_keyframes:
-            if item.frame == current_frame:
-                item.is_marked = True
-                # Update timeline markers
-                timeline_utils.update_timeline_markers(context.scene)
-                self.report({'INFO'}, f"Marked keyframe at frame {current_frame}")
-                return {'FINISHED'}
+        item = find_keyframe_item(context.scene, current_frame)
+        if item is not None:
+            # The is_marked callback updates the timeline marker
+            item.is_marked = True
+            self.report({'INFO'}, f"Marked keyframe at frame {current_frame}")
+            return {'FINISHED'}
         
         # If keyframe doesn't exist, add to list
-        item = context.scene.btc_keyframes.add()
-        item.frame = current_frame
-        item.is_marked = True
-        
-        # Update timeline markers
-        timeline_utils.update_timeline_markers(context.scene)
+        # (the is_marked callback adds the timeline marker)
+        add_keyframe_item(context.scene, current_frame, is_marked=True)
         
         self.report({'INFO'}, f"Added and marked keyframe at frame {current_frame}")
         return {'FINISHED'}
@@ -126,13 +176,12 @@ class BTC_OT_ClearCurrentKeyframe(Operator):
         current_frame = context.scene.frame_current
         
         # Find and clear keyframe marking
-        for item in context.scene.btc_keyframes:
-            if item.frame == current_frame:
-                item.is_marked = False
-                # Update timeline markers
-                timeline_utils.update_timeline_markers(context.scene)
-                self.report({'INFO'}, f"Cleared keyframe at frame {current_frame}")
-                return {'FINISHED'}
+        item = find_keyframe_item(context.scene, current_frame)
+        if item is not None:
+            # The is_marked callback updates the timeline marker
+            item.is_marked = False
+            self.report({'INFO'}, f"Cleared keyframe at frame {current_frame}")
+            return {'FINISHED'}
         
         self.report({'WARNING'}, f"No keyframe found at frame {current_frame}")
         return {'CANCELLED'}
@@ -149,14 +198,9 @@ class BTC_OT_MarkAllKeyframes(Operator):
         return context.scene.btc_armature is not None and len(context.scene.btc_keyframes) > 0
     
     def execute(self, context):
-        count = 0
-        for item in context.scene.btc_keyframes:
-            if not item.is_marked:
-                item.is_marked = True
-                count += 1
-        
-        # Update timeline markers
-        timeline_utils.update_timeline_markers(context.scene)
+        # Markers are synced once when the batch ends
+        with timeline_utils.batch_mark_edits(context.scene):
+            count = keyframe_scan.set_all_marked(context.scene.btc_keyframes, True)
         
         self.report({'INFO'}, f"Marked {count} keyframes")
         return {'FINISHED'}
@@ -173,14 +217,9 @@ class BTC_OT_ClearAllKeyframes(Operator):
         return context.scene.btc_armature is not None and len(context.scene.btc_keyframes) > 0
     
     def execute(self, context):
-        count = 0
-        for item in context.scene.btc_keyframes:
-            if item.is_marked:
-                item.is_marked = False
-                count += 1
-        
-        # Update timeline markers
-        timeline_utils.update_timeline_markers(context.scene)
+        # Markers are synced once when the batch ends
+        with timeline_utils.batch_mark_edits(context.scene):
+            count = keyframe_scan.set_all_marked(context.scene.btc_keyframes, False)
         
         self.report({'INFO'}, f"Cleared {count} keyframes")
         return {'FINISHED'}
@@ -198,16 +237,14 @@ class BTC_OT_ToggleMarkers(Operator):
             # Create property if it doesn't exist
             bpy.types.Scene.btc_show_markers = bpy.props.BoolProperty(
                 name="Show Timeline Markers", 
-                default=True
+                default=True,
+                update=timeline_utils.show_markers_update
             )
             context.scene.btc_show_markers = True
         else:
-            # Toggle the property
+            # Toggle the property, show_markers_update syncs the markers
             context.scene.btc_show_markers = not context.scene.btc_show_markers
         
-        # Update timeline markers
-        timeline_utils.update_timeline_markers(context.scene)
-        
         if context.scene.btc_show_markers:
             self.report({'INFO'}, "Timeline markers visible")
         else:
@@ -228,31 +265,20 @@ class BTC_OT_RefreshKeyframeList(Operator):
     
     def execute(self, context):
         # Store marked keyframes
-        marked_frames = {}
-        for item in context.scene.btc_keyframes:
-            if item.is_marked:
-                marked_frames[item.frame] = True
+        marked_frames = set(timeline_utils.get_marked_frames(context.scene))
+        invalidate_keyframe_lookup(context.scene)
         
-        # Update keyframe list
+        # Update keyframe list, restoring mark status
         armature = context.scene.btc_armature
-        context.scene.btc_keyframes.clear()
+        action = keyframe_scan.get_armature_action(armature)
         
-        if armature and armature.animation_data and armature.animation_data.action:
-            keyframes = set()
-            
-            for fcurve in armature.animation_data.action.fcurves:
-                for keyframe in fcurve.keyframe_points:
-                    frame = int(keyframe.co[0])
-                    keyframes.add(frame)
-            
-            # Add keyframes to list, restoring mark status
-            for frame in sorted(list(keyframes)):
-                item = context.scene.btc_keyframes.add()
-                item.frame = frame
-                item.is_marked = frame in marked_frames
-        
-        # Update timeline markers
-        timeline_utils.update_timeline_markers(context.scene)
+        # Timeline markers are synced once when the batch ends
+        with timeline_utils.batch_mark_edits(context.scene):
+            if action:
+                frames = keyframe_scan.scan_action_frames(action)
+                keyframe_scan.fill_keyframe_list(context.scene, frames, marked_frames)
+            else:
+                context.scene.btc_keyframes.clear()
         
         self.report({'INFO'}, "Keyframe list refreshed")
         return {'FINISHED'}
@@ -268,18 +294,12 @@ class BTC_OT_KeyframeAdd(Operator):
         current_frame = context.scene.frame_current
         
         # Check if already exists
-        for item in context.scene.btc_keyframes:
-            if item.frame == current_frame:
-                self.report({'INFO'}, f"Frame {current_frame} already in list")
-                return {'CANCELLED'}
-        
-        # Add new keyframe
-        item = context.scene.btc_keyframes.add()
-        item.frame = current_frame
-        item.is_marked = True
+        if find_keyframe_index(context.scene, current_frame) >= 0:
+            self.report({'INFO'}, f"Frame {current_frame} already in list")
+            return {'CANCELLED'}
         
-        # Update timeline markers
-        timeline_utils.update_timeline_markers(context.scene)
+        # Add new keyframe (the is_marked callback adds the timeline marker)
+        add_keyframe_item(context.scene, current_frame, is_marked=True)
         
         self.report({'INFO'}, f"Added keyframe at frame {current_frame}")
         return {'FINISHED'}
@@ -302,6 +322,7 @@ class BTC_OT_KeyframeRemove(Operator):
         
         # Remove keyframe
         context.scene.btc_keyframes.remove(idx)
+        invalidate_keyframe_lookup(context.scene)
         
         # Adjust index if needed
         if idx >= len(context.scene.btc_keyframes):
@@ -336,11 +357,13 @@ class BTC_OT_KeyframeMove(Operator):
         
         if self.direction == "UP" and idx > 0:
             keyframes.move(idx, idx - 1)
+            invalidate_keyframe_lookup(context.scene)
             context.scene.btc_keyframe_index -= 1
             self.report({'INFO'}, "Moved keyframe up")
             return {'FINISHED'}
         elif self.direction == "DOWN" and idx < len(keyframes) - 1:
             keyframes.move(idx, idx + 1)
+            invalidate_keyframe_lookup(context.scene)
             context.scene.btc_keyframe_index += 1
             self.report({'INFO'}, "Moved keyframe down")
             return {'FINISHED'}
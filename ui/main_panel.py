@@ -260,7 +260,7 @@ class BTC_PT_CascadeurToBlenderPanel(PanelBasics, Panel):
         box.label(text="Cleanup Tools:", icon="BRUSH_DATA")
         
         row = box.row()
-        row.operator("btc.clean_keyframes", text="Clean Keyframes", icon="BRUSH_DATA")
+        row.operator("btc.clean_keyframes_modal", text="Clean Keyframes", icon="BRUSH_DATA")
 
 # List of classes to register
 classes = [
@@ -0,0 +1,190 @@
+"""Update only the animation of an existing armature from a Cascadeur FBX.
+
+The FBX is imported as usual, its armature is matched against the
+target (btc_armature) by bone names, the imported action is moved onto
+the target and every other data-block created by the import is removed.
+Round trips therefore do not add objects, meshes or materials.
+"""
+import bpy
+
+# Fraction of the target bones the incoming armature must contain
+MIN_BONE_MATCH = 0.5
+
+# Largest difference allowed between rest matrices (armature space) and
+# between object scales; beyond it pose channels would land wrong
+REST_TOLERANCE = 1e-3
+
+# bpy.data collections cleaned after the import, objects first so the
+# data they use loses its users before it is removed
+IMPORT_COLLECTIONS = (
+    "objects", "meshes", "armatures", "materials", "images", "textures", "node_groups",
+    "cameras", "lights", "curves", "collections", "actions", "shape_keys",
+)
+
+
+def snapshot():
+    """Pointers of every data-block in IMPORT_COLLECTIONS."""
+    result = {}
+    for name in IMPORT_COLLECTIONS:
+        collection = getattr(bpy.data, name, None)
+        if collection is not None:
+            result[name] = {block.as_pointer() for block in collection}
+    return result
+
+
+def new_datablocks(before):
+    """Data-blocks created since snapshot() returned before, per collection."""
+    result = {}
+    for name, pointers in before.items():
+        collection = getattr(bpy.data, name)
+        result[name] = [block for block in collection if block.as_pointer() not in pointers]
+    return result
+
+
+def bone_match(source, target):
+    """(matched, total) bone names of target found in source."""
+    target_names = {bone.name for bone in target.data.bones}
+    source_names = {bone.name for bone in source.data.bones}
+    return len(target_names & source_names), len(target_names)
+
+
+def find_matching_armature(objects, target):
+    """Imported armature object sharing the most bones with target, or None."""
+    best, best_matched = None, 0
+    for obj in objects:
+        if obj.type != 'ARMATURE':
+            continue
+        matched, total = bone_match(obj, target)
+        if total and matched / total >= MIN_BONE_MATCH and matched > best_matched:
+            best, best_matched = obj, matched
+    return best
+
+
+def _max_difference(a, b):
+    return max(abs(x - y) for row_a, row_b in zip(a, b) for x, y in zip(row_a, row_b))
+
+
+def rest_pose_mismatch(source, target, tolerance=REST_TOLERANCE):
+    """Why source's animation cannot be applied to target as is, or None.
+
+    Compares the object scales and the rest matrix (matrix_local) of
+    every bone both armatures share. Translations are compared relative
+    to the bone length so big rigs get the same tolerance as small ones.
+    """
+    source_scale = source.matrix_world.to_scale()
+    target_scale = target.matrix_world.to_scale()
+    for s, t in zip(source_scale, target_scale):
+        if abs(s - t) > tolerance * max(abs(t), 1e-6):
+            return (f"object scale differs ({', '.join(f'{v:.4g}' for v in source_scale)} "
+                    f"vs {', '.join(f'{v:.4g}' for v in target_scale)})")
+
+    source_bones = source.data.bones
+    differing = []
+    for bone in target.data.bones:
+        other = source_bones.get(bone.name)
+        if other is None:
+            continue
+        rotation = _max_difference(bone.matrix_local.to_3x3(), other.matrix_local.to_3x3())
+        offset = (bone.matrix_local.translation - other.matrix_local.translation).length
+        if rotation > tolerance or offset > tolerance * max(bone.length, 1e-6):
+            differing.append(bone.name)
+    if differing:
+        names = ", ".join(differing[:5]) + (", ..." if len(differing) > 5 else "")
+        return f"rest pose differs on {len(differing)} bones ({names})"
+    return None
+
+
+def assign_action(target, action):
+    """Make action the active action of target, replacing the previous one.
+
+    The previous action is removed if nothing else uses it, and the new
+    action takes over its name.
+    """
+    anim_data = target.animation_data or target.animation_data_create()
+    old_action = anim_data.action
+    old_name = old_action.name if old_action else None
+
+    anim_data.action = action
+    # Blender 4.4+: the slot of the imported action belongs to the imported object
+    if hasattr(anim_data, "action_slot") and anim_data.action_slot is None:
+        slots = getattr(anim_data, "action_suitable_slots", None) or getattr(action, "slots", [])
+        if len(slots):
+            anim_data.action_slot = slots[0]
+
+    if old_action and old_action != action:
+        if old_action.users == 0 and not old_action.use_fake_user:
+            bpy.data.actions.remove(old_action)
+            action.name = old_name
+
+
+def remove_datablocks(blocks, keep=()):
+    """Remove data-blocks returned by new_datablocks, except those in keep.
+
+    Returns the number of data-blocks removed.
+    """
+    keep_pointers = {block.as_pointer() for block in keep}
+    removed = 0
+    for name in IMPORT_COLLECTIONS:
+        collection = getattr(bpy.data, name, None)
+        if collection is None or not hasattr(collection, "remove"):
+            continue
+        for block in blocks.get(name, []):
+            try:
+                if block.as_pointer() in keep_pointers:
+                    continue
+                if name == "objects":
+                    collection.remove(block, do_unlink=True)
+                else:
+                    collection.remove(block)
+                removed += 1
+            except ReferenceError:
+                # Already removed together with its owner
+                pass
+    return removed
+
+
+def import_action_only(fbx_path, target):
+    """Import fbx_path and apply only its animation to the target armature.
+
+    Returns a dict with the action name, matched/total bones and the
+    number of imported data-blocks that were discarded. Raises
+    ValueError when the file has no armature matching target, or when
+    its object scale or bone rest poses differ from the target's; the
+    scene is left as it was in that case.
+    """
+    before = snapshot()
+    bpy.ops.import_scene.fbx(filepath=fbx_path, use_anim=True)
+    created = new_datablocks(before)
+
+    source = find_matching_armature(created.get("objects", []), target)
+    action = None
+    if source is not None and source.animation_data:
+        action = source.animation_data.action
+
+    if action is None:
+        remove_datablocks(created)
+        if source is None:
+            raise ValueError(f"No armature in {fbx_path} matches {target.name}")
+        raise ValueError(f"Armature in {fbx_path} has no animation")
+
+    mismatch = rest_pose_mismatch(source, target)
+    if mismatch:
+        remove_datablocks(created)
+        raise ValueError(f"Armature in {fbx_path} does not match {target.name}: {mismatch}")
+
+    matched, total = bone_match(source, target)
+    # The imported object is removed, the action must not go with it
+    source.animation_data.action = None
+    assign_action(target, action)
+    removed = remove_datablocks(created, keep=[action])
+
+    # The import changed the selection, give it back to the armature
+    try:
+        for obj in bpy.context.selected_objects:
+            obj.select_set(False)
+        target.select_set(True)
+        bpy.context.view_layer.objects.active = target
+    except (AttributeError, RuntimeError):
+        pass
+
+    return {"action": action.name, "matched": matched, "bones": total, "removed": removed}
@@ -2,6 +2,10 @@ import subprocess
 import platform
 import os
 import bpy
+from . import preferences, file_utils, socket_transport
+
+# Cascadeur script that handles every pending request from Blender
+COMMAND_SERVER_SCRIPT = "commands.externals.temp_command_server"
 
 def file_exists(file_path):
     """Check if a file exists."""
@@ -99,9 +103,27 @@ class CascadeurHandler:
     def execute_csc_command(self, command):
         """
         Execute a Cascadeur command using the specified executable path.
+        
+        With the socket transport enabled the command is sent to the
+        running Cascadeur as a run_command request. The listener stores it
+        as a trigger file and reports whether a command server is draining
+        on Cascadeur's command thread; if so, that drain runs it and
+        nothing is launched. Otherwise the command server script is
+        launched once and handles it with every other pending request.
         """
         if not self.is_csc_exe_path_valid:
             raise FileNotFoundError("Cascadeur executable not found")
+        
+        port = preferences.get_socket_port(bpy.context)
+        if port:
+            exchange_folder = preferences.get_exchange_folder(bpy.context)
+            message = file_utils.build_trigger_data("run_command", {"command": command})
+            delivered, reply = socket_transport.deliver(exchange_folder, message, port)
+            if not delivered:
+                return False
+            if reply and reply.get("draining"):
+                return True
+            command = COMMAND_SERVER_SCRIPT
             
         try:
             subprocess.Popen([self.csc_exe_path_addon_preference, "--run-script", command])
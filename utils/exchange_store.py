@@ -0,0 +1,294 @@
+"""Content-addressed store for files sent to Cascadeur.
+
+Files live in <exchange>/store/objects named by the SHA-256 of their
+content, so identical exports are kept once. store/manifest.json maps
+logical names (e.g. "object/Armature") to the hash last published under
+that name, together with the change fingerprint of the data it was
+exported from. A repeat export whose fingerprint matches can be skipped.
+"""
+import os
+import json
+import time
+import hashlib
+import numpy as np
+from . import file_utils
+
+STORE_FOLDER = "store"
+OBJECTS_FOLDER = "objects"
+MANIFEST_NAME = "manifest.json"
+
+_HASH_CHUNK = 1024 * 1024
+
+
+def hash_file(path):
+    """SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ExchangeStore:
+    """Hash-named files plus a manifest of logical names."""
+
+    def __init__(self, exchange_folder):
+        self.folder = os.path.join(exchange_folder, STORE_FOLDER)
+        self.objects_folder = os.path.join(self.folder, OBJECTS_FOLDER)
+        self.manifest_path = os.path.join(self.folder, MANIFEST_NAME)
+
+    def load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault("entries", {})
+        return manifest
+
+    def save_manifest(self, manifest):
+        file_utils.ensure_dir_exists(self.folder)
+        file_utils.write_json_atomic(self.manifest_path, manifest)
+
+    def object_path(self, content_hash, extension):
+        return os.path.join(self.objects_folder, content_hash + extension)
+
+    def staging_path(self, extension):
+        """Hidden path to export into before put_file; same folder, so publishing is a rename."""
+        file_utils.ensure_dir_exists(self.objects_folder)
+        return os.path.join(self.objects_folder, f".staging_{os.getpid()}_{time.time_ns()}{extension}")
+
+    def lookup(self, name):
+        """Manifest entry for a logical name whose file still exists, or None."""
+        entry = self.load_manifest()["entries"].get(name)
+        if entry and os.path.exists(entry.get("path", "")):
+            return entry
+        return None
+
+    def find_unchanged(self, name, fingerprint):
+        """Entry for name if it was exported from data with this fingerprint."""
+        entry = self.lookup(name)
+        if entry and fingerprint and entry.get("fingerprint") == fingerprint:
+            return entry
+        return None
+
+    def put_file(self, source_path, name, fingerprint=None, move=True):
+        """Add a file under its content hash and point name at it.
+
+        Args:
+            source_path: File to add
+            name: Logical name recorded in the manifest
+            fingerprint: Change fingerprint of the exported data
+            move: Move the file in (True) or publish a link/copy of it
+
+        Returns:
+            Path of the stored file
+        """
+        content_hash = hash_file(source_path)
+        extension = os.path.splitext(source_path)[1].lower()
+        target_path = self.object_path(content_hash, extension)
+        file_utils.ensure_dir_exists(self.objects_folder)
+
+        if os.path.exists(target_path):
+            # Same content already stored
+            if move:
+                os.remove(source_path)
+        elif move:
+            try:
+                os.replace(source_path, target_path)
+            except OSError:
+                # Different filesystem
+                file_utils.link_or_copy(source_path, target_path)
+                os.remove(source_path)
+        else:
+            file_utils.link_or_copy(source_path, target_path)
+
+        manifest = self.load_manifest()
+        manifest["entries"][name] = {
+            "hash": content_hash,
+            "path": target_path,
+            "size": os.path.getsize(target_path),
+            "fingerprint": fingerprint,
+            "time": time.time(),
+            "sent": False,
+        }
+        self.save_manifest(manifest)
+        return target_path
+
+    def mark_sent(self, name, content_hash=None):
+        """Record that Cascadeur has handled the file under name.
+
+        With content_hash, nothing is recorded if name has been pointed at
+        another file since it was sent.
+        """
+        manifest = self.load_manifest()
+        entry = manifest["entries"].get(name)
+        if entry and (content_hash is None or entry.get("hash") == content_hash):
+            entry["sent"] = True
+            entry["sent_time"] = time.time()
+            self.save_manifest(manifest)
+
+
+def hash_collection(digest, collection, attribute, width, dtype=np.float32):
+    """Feed a bulk foreach_get of attribute into digest."""
+    buffer = np.empty(len(collection) * width, dtype=dtype)
+    if len(buffer):
+        try:
+            collection.foreach_get(attribute, buffer)
+        except (TypeError, RuntimeError, AttributeError):
+            # Attribute without bulk access, read it per item
+            buffer = np.array([np.asarray(getattr(item, attribute), dtype=dtype).ravel()
+                               for item in collection], dtype=dtype).ravel()
+    digest.update(buffer.tobytes())
+
+
+def _hash_action(digest, action):
+    """Feed every fcurve of an action into digest."""
+    digest.update(action.name.encode("utf-8"))
+    digest.update(np.asarray(action.frame_range, dtype=np.float32).tobytes())
+    for fcurve in action.fcurves:
+        _hash_fcurve(digest, fcurve)
+
+
+def _hash_fcurve(digest, fcurve):
+    digest.update(f"{fcurve.data_path}[{fcurve.array_index}]{fcurve.mute};".encode("utf-8"))
+    keyframe_points = fcurve.keyframe_points
+    hash_collection(digest, keyframe_points, "co", 2)
+    hash_collection(digest, keyframe_points, "handle_left", 2)
+    hash_collection(digest, keyframe_points, "handle_right", 2)
+    hash_collection(digest, keyframe_points, "interpolation", 1, np.int32)
+    for modifier in fcurve.modifiers:
+        digest.update(_rna_values(modifier).encode("utf-8"))
+
+
+def _rna_values(struct):
+    """Text of every RNA property of struct; ID pointers by name."""
+    values = []
+    for prop in struct.bl_rna.properties:
+        if prop.identifier == "rna_type" or prop.type == 'COLLECTION':
+            continue
+        value = getattr(struct, prop.identifier, None)
+        if hasattr(value, "bl_rna"):
+            value = getattr(value, "name", None)
+        elif prop.type in {'FLOAT', 'INT', 'BOOLEAN'} and getattr(prop, "array_length", 0):
+            value = tuple(np.asarray(value).ravel().tolist())
+        elif isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        values.append(f"{prop.identifier}={value!r}")
+    return ";".join(values)
+
+
+def _hash_constraints(digest, constraints, seen_targets):
+    for constraint in constraints:
+        digest.update(_rna_values(constraint).encode("utf-8"))
+        for target in [getattr(constraint, "target", None)] + [t.target for t in getattr(constraint, "targets", [])]:
+            if target is not None and target.name not in seen_targets:
+                seen_targets.add(target.name)
+                _hash_id_motion(digest, target)
+
+
+def _hash_id_motion(digest, obj):
+    """Transform and animation of a constraint target, baked into the export."""
+    digest.update(obj.name.encode("utf-8"))
+    digest.update(np.asarray(obj.matrix_world, dtype=np.float32).tobytes())
+    anim_data = getattr(obj, "animation_data", None)
+    if anim_data and anim_data.action:
+        _hash_action(digest, anim_data.action)
+
+
+def _hash_drivers(digest, anim_data):
+    if not anim_data:
+        return
+    for fcurve in anim_data.drivers:
+        _hash_fcurve(digest, fcurve)
+        driver = fcurve.driver
+        digest.update(f"{driver.type}:{driver.expression}:{driver.use_self};".encode("utf-8"))
+        for variable in driver.variables:
+            digest.update(f"{variable.name}:{variable.type};".encode("utf-8"))
+            for target in variable.targets:
+                digest.update(f"{target.id.name if target.id else ''}:{target.data_path}:"
+                              f"{target.bone_target}:{target.transform_type}:{target.transform_space};"
+                              .encode("utf-8"))
+
+
+def _hash_nla(digest, anim_data, seen_actions):
+    for track in anim_data.nla_tracks:
+        digest.update(f"{track.name}:{track.mute}:{track.is_solo};".encode("utf-8"))
+        for strip in track.strips:
+            digest.update(repr((strip.name, strip.mute, strip.blend_type, strip.extrapolation,
+                                round(strip.influence, 6), round(strip.scale, 6), round(strip.repeat, 6),
+                                strip.frame_start, strip.frame_end,
+                                strip.action_frame_start, strip.action_frame_end)).encode("utf-8"))
+            if strip.action and strip.action.name not in seen_actions:
+                seen_actions.add(strip.action.name)
+                _hash_action(digest, strip.action)
+
+
+def armature_fingerprint(armature, action=None, settings=None, scene=None, actions=()):
+    """Cheap change fingerprint of what an armature export contains.
+
+    Hashes the bone hierarchy and rest pose, the object transform, the
+    current pose and every fcurve of the action with bulk foreach_get
+    reads, plus the export settings. Constraints (with their targets'
+    motion) and drivers are included since the exporter bakes them, and
+    so are the scene frame rate, frame range and unit scale. NLA strips
+    and, unless bake_anim_use_all_actions is off, the other actions
+    (pass bpy.data.actions) are baked as well and hashed too. Returns a
+    hex digest.
+    """
+    digest = hashlib.sha256()
+    # Sets are sorted so the digest does not depend on hash seeding
+    normalized = sorted((key, sorted(value) if isinstance(value, (set, frozenset)) else value)
+                        for key, value in (settings or {}).items())
+    digest.update(repr(normalized).encode("utf-8"))
+    digest.update(armature.name.encode("utf-8"))
+    digest.update(np.asarray(armature.matrix_world, dtype=np.float32).tobytes())
+
+    if scene is not None:
+        render = scene.render
+        digest.update(repr((render.fps, round(render.fps_base, 6), scene.frame_start, scene.frame_end,
+                            round(scene.unit_settings.scale_length, 6),
+                            scene.unit_settings.system)).encode("utf-8"))
+
+    # Bone hierarchy and rest pose
+    bones = armature.data.bones
+    for bone in bones:
+        digest.update(f"{bone.name}<{bone.parent.name if bone.parent else ''};".encode("utf-8"))
+    hash_collection(digest, bones, "head_local", 3)
+    hash_collection(digest, bones, "tail_local", 3)
+    hash_collection(digest, bones, "matrix_local", 16)
+
+    # Current pose (exported when there is no action)
+    pose = armature.pose
+    if pose:
+        hash_collection(digest, pose.bones, "matrix_basis", 16)
+
+    # Constraints and drivers, baked by the exporter
+    seen_targets = {armature.name}
+    _hash_constraints(digest, armature.constraints, seen_targets)
+    if pose:
+        for pose_bone in pose.bones:
+            if pose_bone.constraints:
+                digest.update(pose_bone.name.encode("utf-8"))
+                _hash_constraints(digest, pose_bone.constraints, seen_targets)
+    _hash_drivers(digest, armature.animation_data)
+    _hash_drivers(digest, getattr(armature.data, "animation_data", None))
+
+    if action is None and armature.animation_data:
+        action = armature.animation_data.action
+    seen_actions = set()
+    if action:
+        seen_actions.add(action.name)
+        _hash_action(digest, action)
+
+    # Exporter defaults: NLA strips and every other action become takes too
+    settings = settings or {}
+    if armature.animation_data and settings.get("bake_anim_use_nla_strips", True):
+        _hash_nla(digest, armature.animation_data, seen_actions)
+    if settings.get("bake_anim_use_all_actions", True):
+        for other in sorted(actions, key=lambda a: a.name):
+            if other.name not in seen_actions:
+                seen_actions.add(other.name)
+                _hash_action(digest, other)
+
+    return digest.hexdigest()
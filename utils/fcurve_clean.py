@@ -0,0 +1,203 @@
+import time
+import numpy as np
+
+# Keyframe point attributes copied when an fcurve is rewritten:
+# (name, components per key, dtype). Enums are read and written as ints.
+KEYFRAME_ATTRIBUTES = (
+    ("co", 2, np.float32),
+    ("handle_left", 2, np.float32),
+    ("handle_right", 2, np.float32),
+    ("interpolation", 1, np.int32),
+    ("handle_left_type", 1, np.int32),
+    ("handle_right_type", 1, np.int32),
+    ("easing", 1, np.int32),
+    ("type", 1, np.int32),
+    ("back", 1, np.float32),
+    ("amplitude", 1, np.float32),
+    ("period", 1, np.float32),
+    ("select_control_point", 1, bool),
+    ("select_left_handle", 1, bool),
+    ("select_right_handle", 1, bool),
+)
+
+# FCurve settings carried over when an fcurve has to be recreated
+FCURVE_SETTINGS = ("extrapolation", "color_mode", "color", "mute", "hide", "lock", "select", "auto_smoothing")
+
+
+def read_keyframe_arrays(fcurve):
+    """Read every keyframe attribute of an fcurve in bulk.
+
+    Returns a dict of attribute name -> array shaped (keys, components).
+    """
+    keyframe_points = fcurve.keyframe_points
+    count = len(keyframe_points)
+    arrays = {}
+    for name, width, dtype in KEYFRAME_ATTRIBUTES:
+        buffer = np.empty(count * width, dtype=dtype)
+        if count:
+            keyframe_points.foreach_get(name, buffer)
+        arrays[name] = buffer.reshape(count, width)
+    return arrays
+
+
+def _rna_settings(struct):
+    """Writable plain properties of an RNA struct, as a dict."""
+    settings = {}
+    for prop in struct.bl_rna.properties:
+        if prop.is_readonly or prop.type in {'POINTER', 'COLLECTION'}:
+            continue
+        value = getattr(struct, prop.identifier)
+        if getattr(prop, "array_length", 0):
+            value = tuple(value)
+        settings[prop.identifier] = value
+    return settings
+
+
+def _apply_settings(struct, settings):
+    for name, value in settings.items():
+        try:
+            setattr(struct, name, value)
+        except (AttributeError, TypeError, ValueError):
+            pass
+
+
+def _recreate_fcurve(fcurve):
+    """Replace fcurve with an empty one on the same channel.
+
+    Used when keyframe_points.clear() is unavailable. Keeps the group,
+    modifiers, extrapolation and display settings. The new fcurve is
+    appended to the action, so callers look fcurves up by
+    (data_path, array_index) rather than by position.
+    """
+    fcurves = fcurve.id_data.fcurves
+    data_path, array_index = fcurve.data_path, fcurve.array_index
+    group_name = fcurve.group.name if fcurve.group else ""
+    settings = {name: getattr(fcurve, name) for name in FCURVE_SETTINGS if hasattr(fcurve, name)}
+    if "color" in settings:
+        settings["color"] = tuple(settings["color"])
+    modifiers = [(modifier.type, _rna_settings(modifier)) for modifier in fcurve.modifiers]
+
+    fcurves.remove(fcurve)
+    new_fcurve = fcurves.new(data_path, index=array_index, action_group=group_name)
+    _apply_settings(new_fcurve, settings)
+    for modifier_type, modifier_settings in modifiers:
+        _apply_settings(new_fcurve.modifiers.new(modifier_type), modifier_settings)
+    return new_fcurve
+
+
+def _resize_keyframe_points(fcurve, count):
+    """Give fcurve exactly count keyframes, returns the fcurve to write into.
+
+    Shrinking never removes keys one by one: the points are cleared in
+    one call (or the fcurve is recreated on versions without clear())
+    and count new points are added.
+    """
+    keyframe_points = fcurve.keyframe_points
+    current = len(keyframe_points)
+    if count > current:
+        keyframe_points.add(count - current)
+    elif count < current:
+        if hasattr(keyframe_points, "clear"):
+            keyframe_points.clear()
+        else:
+            fcurve = _recreate_fcurve(fcurve)
+        fcurve.keyframe_points.add(count)
+    return fcurve
+
+
+def write_keyframe_arrays(fcurve, arrays):
+    """Replace all keyframes of an fcurve with the given arrays in one pass.
+
+    Returns the fcurve holding the keys, which is a new one if it had to
+    be recreated.
+    """
+    count = len(arrays["co"])
+    fcurve = _resize_keyframe_points(fcurve, count)
+    keyframe_points = fcurve.keyframe_points
+
+    if count:
+        for name, _width, dtype in KEYFRAME_ATTRIBUTES:
+            keyframe_points.foreach_set(name, np.ascontiguousarray(arrays[name], dtype=dtype).ravel())
+    fcurve.update()
+    return fcurve
+
+
+def fcurve_keys(action):
+    """(data_path, array_index) of every fcurve, stable if fcurves are recreated."""
+    return [(fcurve.data_path, fcurve.array_index) for fcurve in action.fcurves]
+
+
+def find_fcurve(action, key):
+    data_path, array_index = key
+    return action.fcurves.find(data_path, index=array_index)
+
+
+def marked_frames_array(marked_frames):
+    """Sorted int array of marked frames, for use with clean_fcurve."""
+    return np.unique(np.fromiter(marked_frames, dtype=np.int64))
+
+
+def clean_fcurve(fcurve, marked):
+    """Keep only the keyframes of an fcurve that sit on a marked frame.
+
+    marked is an array from marked_frames_array. Returns the number of
+    removed keyframes and the original arrays (None if nothing changed),
+    which restore_fcurve can put back. On Blender versions without
+    keyframe_points.clear() the fcurve is recreated, so do not use it
+    afterwards; find it again with find_fcurve.
+    """
+    arrays = read_keyframe_arrays(fcurve)
+    # astype truncates toward zero, same as int(keyframe.co[0])
+    frames = arrays["co"][:, 0].astype(np.int64)
+    keep = np.isin(frames, marked)
+
+    removed = len(keep) - int(np.count_nonzero(keep))
+    if removed == 0:
+        return 0, None
+
+    write_keyframe_arrays(fcurve, {name: values[keep] for name, values in arrays.items()})
+    return removed, arrays
+
+
+def restore_fcurve(fcurve, arrays):
+    """Undo clean_fcurve using the arrays it returned."""
+    if arrays is not None:
+        write_keyframe_arrays(fcurve, arrays)
+
+
+def fcurve_label(fcurve):
+    return f"{fcurve.data_path}[{fcurve.array_index}]"
+
+
+def clean_action(action, marked_frames):
+    """Clean every fcurve of an action.
+
+    Returns (removed count, per-fcurve timings) where each timing is
+    (fcurve label, removed keys, milliseconds).
+    """
+    marked = marked_frames_array(marked_frames)
+    removed_total = 0
+    timings = []
+
+    for key in fcurve_keys(action):
+        fcurve = find_fcurve(action, key)
+        # Before cleaning: the fcurve may be replaced by a new one
+        label = fcurve_label(fcurve)
+        start = time.perf_counter()
+        removed, _ = clean_fcurve(fcurve, marked)
+        elapsed = (time.perf_counter() - start) * 1000.0
+        removed_total += removed
+        timings.append((label, removed, elapsed))
+
+    return removed_total, timings
+
+
+def print_timings(timings, limit=10):
+    """Print a short per-fcurve timing report to the console."""
+    if not timings:
+        return
+    total = sum(t[2] for t in timings)
+    print(f"Clean keyframes: {len(timings)} fcurves in {total:.2f} ms "
+          f"(avg {total / len(timings):.3f} ms)")
+    for label, removed, elapsed in sorted(timings, key=lambda t: t[2], reverse=True)[:limit]:
+        print(f"  {label}: removed {removed} in {elapsed:.3f} ms")
@@ -1,9 +1,22 @@
 import os
+import re
+import sys
 import time
 import tempfile
 import shutil
 import json
-from datetime import datetime, timedelta
+import uuid
+import itertools
+import threading
+from collections import OrderedDict
+
+# Per-process trigger sequence; (milliseconds, pid, sequence) orders all triggers
+_trigger_sequence = itertools.count(1)
+_trigger_sequence_lock = threading.Lock()
+
+TRIGGER_NAME_PATTERN = re.compile(
+    r"^trigger_(?P<action>.+)_(?P<millis>\d{13})_(?P<pid>\d+)_(?P<seq>\d+)\.json$"
+)
 
 def ensure_dir_exists(directory):
     """Ensure directory exists, create if not."""
@@ -11,34 +24,198 @@ def ensure_dir_exists(directory):
         os.makedirs(directory)
     return directory
 
-def create_trigger_file(exchange_folder, action, data=None):
-    """Create a trigger file to notify Cascadeur to perform an action."""
-    ensure_dir_exists(exchange_folder)
-    cascadeur_trigger_folder = os.path.join(exchange_folder, "cascadeur_triggers")
-    ensure_dir_exists(cascadeur_trigger_folder)
+def next_trigger_sequence():
+    """Next per-process trigger sequence number (shared by files and socket messages)."""
+    with _trigger_sequence_lock:
+        return next(_trigger_sequence)
+
+def next_trigger_name(action):
+    """Return (file name, sequence) for a unique, totally ordered trigger.
     
-    # Prepare data
-    trigger_data = {
+    trigger_{action}_{milliseconds}_{pid}_{sequence}.json
+    """
+    sequence = next_trigger_sequence()
+    millis = time.time_ns() // 1000000
+    return f"trigger_{action}_{millis:013d}_{os.getpid()}_{sequence:06d}.json", sequence
+
+def trigger_sort_key(filename):
+    """Sort key putting triggers in the order they were written.
+    
+    Names without a sequence (older versions) sort by modification time.
+    """
+    name = os.path.basename(filename)
+    match = TRIGGER_NAME_PATTERN.match(name)
+    if match:
+        return (int(match.group("millis")), int(match.group("pid")), int(match.group("seq")))
+    try:
+        return (int(os.path.getmtime(filename) * 1000), 0, 0)
+    except OSError:
+        return (0, 0, 0)
+
+def write_json_atomic(path, data):
+    """Write JSON next to path and move it into place, so readers never see partial files."""
+    folder, filename = os.path.split(path)
+    temp_path = os.path.join(folder, f".{filename}.{os.getpid()}.tmp")
+    try:
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    return path
+
+def new_request_id():
+    """Unique id echoed back by Cascadeur in the reply to a request."""
+    return uuid.uuid4().hex
+
+def build_trigger_data(action, data=None, sequence=None, request_id=None):
+    """Trigger payload, identical for trigger files and socket messages."""
+    if sequence is None:
+        sequence = next_trigger_sequence()
+    return {
         "action": action,
         "timestamp": time.time(),
+        "pid": os.getpid(),
+        "sequence": sequence,
+        "request_id": request_id or new_request_id(),
         "data": data or {}
     }
+
+def trigger_file_name(trigger_data):
+    """File name of a trigger payload, built from its own timestamp, pid and sequence.
+    
+    The Cascadeur listener names the messages it receives the same way,
+    so a payload written by both sides ends up as a single trigger.
+    """
+    millis = int(trigger_data.get("timestamp", 0) * 1000)
+    return (f"trigger_{trigger_data.get('action', '')}_{millis:013d}_"
+            f"{trigger_data.get('pid', 0)}_{trigger_data.get('sequence', 0):06d}.json")
+
+def write_trigger_data(exchange_folder, trigger_data):
+    """Write a prepared trigger payload to cascadeur_triggers (see trigger_file_name)."""
+    cascadeur_trigger_folder = ensure_dir_exists(os.path.join(exchange_folder, "cascadeur_triggers"))
+    try:
+        return write_json_atomic(os.path.join(cascadeur_trigger_folder, trigger_file_name(trigger_data)),
+                                 trigger_data)
+    except (IOError, PermissionError) as e:
+        print(f"Error creating trigger file: {e}")
+        return None
+
+def create_trigger_file(exchange_folder, action, data=None, request_id=None):
+    """Create a trigger file to notify Cascadeur to perform an action."""
+    ensure_dir_exists(exchange_folder)
+    cascadeur_trigger_folder = os.path.join(exchange_folder, "cascadeur_triggers")
+    ensure_dir_exists(cascadeur_trigger_folder)
     
-    # Create filename with timestamp to avoid conflicts
-    timestamp = int(time.time())
-    trigger_path = os.path.join(cascadeur_trigger_folder, f"trigger_{action}_{timestamp}.json")
+    # Unique name: milliseconds, pid and per-process sequence
+    filename, sequence = next_trigger_name(action)
+    trigger_path = os.path.join(cascadeur_trigger_folder, filename)
+    
+    # Prepare data
+    trigger_data = build_trigger_data(action, data, sequence, request_id)
     
-    # Write trigger file
+    # Write trigger file atomically
     try:
-        with open(trigger_path, 'w') as f:
-            json.dump(trigger_data, f, indent=2)
-        return trigger_path
+        return write_json_atomic(trigger_path, trigger_data)
     except (IOError, PermissionError) as e:
         print(f"Error creating trigger file: {e}")
         return None
 
+def partial_path(path):
+    """Hidden temp path next to path, keeping its extension for exporters that check it."""
+    folder, filename = os.path.split(path)
+    stem, ext = os.path.splitext(filename)
+    return os.path.join(folder, f".{stem}.{os.getpid()}.partial{ext}")
+
+def write_file_atomic(path, writer):
+    """Let writer(temp_path) write next to path, then move the result into place.
+    
+    The temp file lives in the same folder, so publishing is a single
+    rename and readers never see a partially written file.
+    
+    Args:
+        path: Final file path
+        writer: Callable writing the file, returns True on success
+    
+    Returns:
+        path on success, None if writer failed
+    """
+    ensure_dir_exists(os.path.dirname(path))
+    temp_path = partial_path(path)
+    try:
+        if not writer(temp_path) or not os.path.exists(temp_path):
+            return None
+        os.replace(temp_path, path)
+        return path
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+def _reflink(source_path, target_path):
+    """Copy-on-write clone of source_path (Linux FICLONE, macOS clonefile)."""
+    if sys.platform.startswith("linux"):
+        import fcntl
+        FICLONE = 0x40049409
+        with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    elif sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL("libSystem.dylib", use_errno=True)
+        if libc.clonefile(os.fsencode(source_path), os.fsencode(target_path), 0) != 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+    else:
+        raise OSError("Reflinks are not supported on this platform")
+
+def link_or_copy(source_path, target_path):
+    """Publish source_path at target_path as cheaply as the filesystem allows.
+    
+    Tries a reflink (copy-on-write, no data copied), then a hard link
+    (same filesystem), then a full copy. The result appears atomically.
+    
+    Returns:
+        The method used: "reflink", "hardlink" or "copy"
+    """
+    temp_path = partial_path(target_path)
+    attempts = (
+        ("reflink", _reflink),
+        ("hardlink", os.link),
+        ("copy", shutil.copy2),
+    )
+    try:
+        for method, publish in attempts:
+            try:
+                publish(source_path, temp_path)
+            except (OSError, NotImplementedError, AttributeError):
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                if method == "copy":
+                    raise
+                continue
+            if method != "hardlink":
+                shutil.copystat(source_path, temp_path)
+            os.replace(temp_path, target_path)
+            return method
+    finally:
+        if os.path.exists(temp_path):
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
 def copy_file_to_exchange(source_path, exchange_folder, subfolder=None):
-    """Copy file to exchange directory."""
+    """Copy file to exchange directory.
+    
+    Files already in the target folder are used as they are; otherwise
+    the file is reflinked, hard linked or copied (see link_or_copy).
+    """
     ensure_dir_exists(exchange_folder)
     
     # Create subfolder if needed
@@ -51,9 +228,18 @@ def copy_file_to_exchange(source_path, exchange_folder, subfolder=None):
     filename = os.path.basename(source_path)
     target_path = os.path.join(target_folder, filename)
     
+    # Already exported into the exchange folder, nothing to copy
+    try:
+        if os.path.exists(target_path) and os.path.samefile(source_path, target_path):
+            return target_path
+    except OSError:
+        pass
+    
     # Copy file
     try:
-        shutil.copy2(source_path, target_path)
+        method = link_or_copy(source_path, target_path)
+        if method != "copy":
+            print(f"Published {filename} to exchange folder by {method}")
         return target_path
     except (IOError, PermissionError) as e:
         print(f"Error copying file: {e}")
@@ -85,6 +271,52 @@ def get_export_path(file_type="fbx", use_temp=True, exchange_folder=None):
     temp_dir = tempfile.gettempdir()
     return os.path.join(temp_dir, filename)
 
+def trigger_sequence_id(filename):
+    """Identify a trigger by its name, independent of the folder it lives in.
+    
+    trigger_import_scene_1704110400000_4242_000007.json -> (1704110400000, 4242, 7)
+    Names without a sequence (older versions) are identified by their stem:
+    trigger_import_scene_20240101120000.json -> "import_scene_20240101120000"
+    """
+    name = os.path.basename(filename)
+    match = TRIGGER_NAME_PATTERN.match(name)
+    if match:
+        return (int(match.group("millis")), int(match.group("pid")), int(match.group("seq")))
+    if name.startswith("trigger_"):
+        name = name[len("trigger_"):]
+    if name.endswith(".json"):
+        name = name[:-len(".json")]
+    return name
+
+class ProcessedTriggerLog:
+    """Bounded LRU record of trigger sequence ids that were already handled.
+    
+    Processed triggers are renamed, so an id only needs remembering until
+    the rename has happened; the oldest ids are evicted past max_entries.
+    """
+    
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+    
+    def __contains__(self, sequence_id):
+        if sequence_id in self._entries:
+            self._entries.move_to_end(sequence_id)
+            return True
+        return False
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def add(self, sequence_id):
+        self._entries[sequence_id] = None
+        self._entries.move_to_end(sequence_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        self._entries.clear()
+
 def mark_trigger_as_processed(trigger_path):
     """Mark trigger file as processed by renaming it."""
     if os.path.exists(trigger_path):
@@ -100,29 +332,179 @@ def mark_trigger_as_processed(trigger_path):
                 pass
     return None
 
-def cleanup_old_triggers(exchange_folder, hours=24):
-    """Clean up old trigger files."""
+class ProcessedTriggerIndex:
+    """Cache of processed trigger files and their mtimes, per folder.
+    
+    A folder is only listed again when its own mtime changes, so finding
+    expired files in an unchanged folder needs one stat call.
+    """
+    
+    def __init__(self):
+        # folder -> (folder mtime, {path: file mtime})
+        self._folders = {}
+    
+    def _scan(self, folder):
+        files = {}
+        for filename in os.listdir(folder):
+            if filename.endswith(".json.processed"):
+                filepath = os.path.join(folder, filename)
+                try:
+                    files[filepath] = os.path.getmtime(filepath)
+                except OSError:
+                    pass
+        return files
+    
+    def files(self, folder):
+        """Return {path: mtime} of processed triggers, rescanning if the folder changed."""
+        try:
+            folder_mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            self._folders.pop(folder, None)
+            return {}
+        
+        cached = self._folders.get(folder)
+        if cached is None or cached[0] != folder_mtime:
+            cached = (folder_mtime, self._scan(folder))
+            self._folders[folder] = cached
+        return cached[1]
+    
+    def forget(self, folder, filepath):
+        cached = self._folders.get(folder)
+        if cached:
+            cached[1].pop(filepath, None)
+
+# Subfolders of the exchange folder holding exported files
+EXCHANGE_DATA_FOLDERS = ("fbx", "json", os.path.join("store", "objects"))
+
+def _collect_paths(value, paths):
+    if isinstance(value, str):
+        paths.add(os.path.normcase(os.path.abspath(value)))
+    elif isinstance(value, dict):
+        for item in value.values():
+            _collect_paths(item, paths)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_paths(item, paths)
+
+def pending_trigger_references(exchange_folder):
+    """Paths mentioned by triggers that have not been processed yet.
+    
+    Every string in a pending trigger's data counts, so files handed to
+    the other side are never removed before it has read them.
+    """
+    paths = set()
+    for subfolder in ("blender_triggers", "cascadeur_triggers"):
+        folder = os.path.join(exchange_folder, subfolder)
+        if not os.path.isdir(folder):
+            continue
+        for filename in os.listdir(folder):
+            if not (filename.startswith("trigger_") and filename.endswith(".json")):
+                continue
+            try:
+                with open(os.path.join(folder, filename), 'r') as f:
+                    _collect_paths(json.load(f).get("data", {}), paths)
+            except (OSError, ValueError, AttributeError):
+                continue
+    return paths
+
+def evict_exchange_files(exchange_folder, max_bytes=0, max_age_hours=0, protected=None,
+                         min_age_seconds=600):
+    """Remove exported files from the exchange folder, least recently used first.
+    
+    Files older than max_age_hours are removed, then the oldest remaining
+    ones until the folders fit in max_bytes (0 disables either limit).
+    Files referenced by pending triggers, files in protected and files
+    younger than min_age_seconds are never removed.
+    
+    Returns:
+        (removed file count, freed bytes)
+    """
     if not exchange_folder or not os.path.exists(exchange_folder):
-        return
+        return 0, 0
+    
+    if protected is None:
+        protected = pending_trigger_references(exchange_folder)
+    protected = {os.path.normcase(os.path.abspath(path)) for path in protected}
+    
+    now = time.time()
+    files = []
+    total = 0
+    for subfolder in EXCHANGE_DATA_FOLDERS:
+        folder = os.path.join(exchange_folder, subfolder)
+        if not os.path.isdir(folder):
+            continue
+        for entry in os.scandir(folder):
+            try:
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            # atime is often not updated (noatime/relatime), mtime covers writes
+            last_used = max(stat.st_atime, stat.st_mtime)
+            files.append((last_used, stat.st_size, entry.path))
+            total += stat.st_size
+    
+    files.sort()
+    age_cutoff = now - max_age_hours * 3600 if max_age_hours else None
+    
+    removed = 0
+    freed = 0
+    for last_used, size, path in files:
+        expired = age_cutoff is not None and last_used < age_cutoff
+        over_quota = max_bytes and total > max_bytes
+        if not expired and not over_quota:
+            # Sorted oldest first: nothing newer is expired either
+            break
+        if now - last_used < min_age_seconds:
+            break
+        if os.path.normcase(os.path.abspath(path)) in protected:
+            continue
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            continue
+        removed += 1
+        freed += size
+        total -= size
+    
+    return removed, freed
+
+def cleanup_old_triggers(exchange_folder, hours=24, index=None):
+    """Clean up old trigger files.
+    
+    Args:
+        exchange_folder: Exchange directory
+        hours: Remove processed triggers older than this
+        index: Optional ProcessedTriggerIndex reused between calls
+    """
+    if not exchange_folder or not os.path.exists(exchange_folder):
+        return 0
+    
+    if index is None:
+        index = ProcessedTriggerIndex()
     
     # Calculate cutoff time
-    cutoff_time = datetime.now() - timedelta(hours=hours)
+    cutoff_time = time.time() - hours * 3600
     
     folders = [
         os.path.join(exchange_folder, "blender_triggers"),
         os.path.join(exchange_folder, "cascadeur_triggers")
     ]
     
+    removed = 0
     for folder in folders:
-        if not os.path.exists(folder):
-            continue
-            
-        for filename in os.listdir(folder):
-            if filename.endswith(".json.processed"):
-                filepath = os.path.join(folder, filename)
-                try:
-                    file_mtime = datetime.fromtimestamp(os.path.getmtime(filepath))
-                    if file_mtime < cutoff_time:
-                        os.remove(filepath)
-                except (OSError, IOError):
-                    pass
\ No newline at end of file
+        expired = [path for path, mtime in index.files(folder).items() if mtime < cutoff_time]
+        for filepath in expired:
+            try:
+                os.remove(filepath)
+                removed += 1
+            except FileNotFoundError:
+                pass
+            except (OSError, IOError):
+                continue
+            index.forget(folder, filepath)
+    
+    return removed
@@ -2,21 +2,197 @@ import os
 import json
 import time
 import threading
+import collections
+import concurrent.futures
 import bpy
 from bpy.app.handlers import persistent
 from . import file_utils
 from . import preferences
+from . import folder_events
+from . import socket_transport
+
+class PendingRequest:
+    """Một yêu cầu đã gửi sang Cascadeur, đang chờ trả lời."""
+    
+    def __init__(self, request_id, action):
+        self.request_id = request_id
+        self.action = action
+        self.transport = None
+        self.sent_at = time.monotonic()
+        self.latency_ms = None
+        # Thread-safe, được resolve từ thread của watcher
+        self.future = concurrent.futures.Future()
+
+class RequestRegistry:
+    """Các yêu cầu đang chờ, theo request_id, và độ trễ của các yêu cầu đã xong."""
+    
+    def __init__(self, timeout=300.0, history=256):
+        self.timeout = timeout
+        self._pending = {}
+        self._lock = threading.Lock()
+        # (request_id, action, transport, milliseconds)
+        self.latencies = collections.deque(maxlen=history)
+    
+    def __len__(self):
+        return len(self._pending)
+    
+    def create(self, action):
+        request = PendingRequest(file_utils.new_request_id(), action)
+        with self._lock:
+            self._pending[request.request_id] = request
+        return request
+    
+    def _pop(self, request_id):
+        with self._lock:
+            return self._pending.pop(request_id, None)
+    
+    def resolve(self, trigger_data):
+        """Hoàn thành các yêu cầu mà trigger trả lời. Trả về danh sách PendingRequest."""
+        request_ids = trigger_data.get("request_ids") or []
+        if trigger_data.get("request_id"):
+            request_ids = list(request_ids) + [trigger_data["request_id"]]
+        
+        resolved = []
+        for request_id in request_ids:
+            request = self._pop(request_id)
+            if request is None:
+                continue
+            
+            request.latency_ms = (time.monotonic() - request.sent_at) * 1000.0
+            self.latencies.append((request.request_id, request.action, request.transport, request.latency_ms))
+            print(f"Request {request.action} answered in {request.latency_ms:.1f} ms ({request.transport})")
+            
+            error = trigger_data.get("data", {}).get("error")
+            if request.future.done():
+                # Người gọi đã hủy future
+                pass
+            elif error:
+                request.future.set_exception(RuntimeError(error))
+            else:
+                request.future.set_result(trigger_data)
+            resolved.append(request)
+        return resolved
+    
+    def fail(self, request_id, error):
+        request = self._pop(request_id)
+        if request is not None and not request.future.done():
+            request.future.set_exception(error)
+    
+    def expire(self):
+        """Hủy các yêu cầu quá self.timeout giây chưa có trả lời (gọi định kỳ từ watcher)."""
+        cutoff = time.monotonic() - self.timeout
+        with self._lock:
+            expired = [r for r in self._pending.values() if r.sent_at < cutoff]
+        for request in expired:
+            self.fail(request.request_id, TimeoutError(f"No reply to {request.action} from Cascadeur"))
+    
+    def cancel_all(self):
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for request in pending:
+            request.future.cancel()
+    
+    def stats(self):
+        """Độ trễ (ms) trung bình và lớn nhất theo action."""
+        by_action = collections.defaultdict(list)
+        for _, action, _, latency in self.latencies:
+            by_action[action].append(latency)
+        return {action: {"count": len(values), "mean_ms": sum(values) / len(values), "max_ms": max(values)}
+                for action, values in by_action.items()}
+
+# Các yêu cầu đang chờ trả lời từ Cascadeur
+_requests = RequestRegistry()
+
+def get_request_registry():
+    return _requests
+
+def send_request(context, action, data=None):
+    """Gửi yêu cầu sang Cascadeur và trả về PendingRequest (None nếu không gửi được).
+    
+    request.future được resolve với trigger trả lời của Cascadeur, trên
+    thread của watcher; callback thêm bằng add_done_callback không được
+    dùng bpy trực tiếp.
+    """
+    exchange_folder = preferences.get_exchange_folder(context)
+    request = _requests.create(action)
+    delivered = socket_transport.send_trigger(exchange_folder, action, data,
+                                              preferences.get_socket_port(context),
+                                              request_id=request.request_id)
+    if not delivered:
+        _requests.fail(request.request_id, RuntimeError(f"Failed to send {action} to Cascadeur"))
+        return None
+    
+    request.transport = "socket" if delivered == "socket" else "file"
+    return request
+
+class TriggerJanitor:
+    """Dọn dẹp các trigger đã xử lý theo lịch riêng, tách khỏi vòng lặp watcher."""
+    
+    def __init__(self, exchange_folder, hours=24, interval=600.0, max_bytes=0, max_age_hours=0):
+        self.exchange_folder = exchange_folder
+        # Được cập nhật từ main thread, thread này không đọc bpy.context
+        self.hours = hours
+        # Giới hạn dung lượng và tuổi của fbx/, json/, store/objects (0 = không giới hạn)
+        self.max_bytes = max_bytes
+        self.max_age_hours = max_age_hours
+        self.interval = interval
+        self.index = file_utils.ProcessedTriggerIndex()
+        self._stop_event = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        if self.thread:
+            return
+        self._stop_event.clear()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self._stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+    
+    def run_once(self):
+        """Xóa các trigger cũ hơn self.hours, trả về số file đã xóa."""
+        return file_utils.cleanup_old_triggers(self.exchange_folder, self.hours, self.index)
+    
+    def evict_once(self):
+        """Giải phóng file export theo quota LRU, trả về (số file, số byte)."""
+        if not self.max_bytes and not self.max_age_hours:
+            return 0, 0
+        return file_utils.evict_exchange_files(self.exchange_folder, self.max_bytes, self.max_age_hours)
+    
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                removed = self.run_once()
+                if removed:
+                    print(f"B2C janitor removed {removed} old trigger files")
+                evicted, freed = self.evict_once()
+                if evicted:
+                    print(f"B2C janitor evicted {evicted} exported files ({freed / (1024 * 1024):.1f} MB)")
+            except Exception as e:
+                print(f"B2C janitor error: {e}")
+            self._stop_event.wait(self.interval)
 
 class FileWatcher:
     """Theo dõi thư mục trao đổi file và xử lý khi có file mới."""
     
-    def __init__(self, exchange_folder, callback):
+    def __init__(self, exchange_folder, callback, cleanup_hours=24, max_size_mb=0, max_age_hours=0):
         self.exchange_folder = exchange_folder
         self.callback = callback
+        self.janitor = TriggerJanitor(exchange_folder, cleanup_hours,
+                                      max_bytes=max_size_mb * 1024 * 1024, max_age_hours=max_age_hours)
         self.is_running = False
         self.thread = None
-        self.processed_files = set()
+        # Bounded, keyed by trigger sequence id so it stays flat over long sessions
+        self.processed_files = file_utils.ProcessedTriggerLog()
         self.last_error_time = 0
+        # Quét toàn bộ thư mục ít nhất mỗi rescan_interval giây
+        self.rescan_interval = 5.0
+        # Thời gian chờ trước khi coi file JSON lỗi là hỏng
+        self.partial_write_grace = 2.0
     
     def start(self):
         """Khởi động thread theo dõi."""
@@ -27,14 +203,25 @@ class FileWatcher:
         self.thread = threading.Thread(target=self._run_watcher)
         self.thread.daemon = True
         self.thread.start()
+        self.janitor.start()
     
     def stop(self):
         """Dừng thread theo dõi."""
         self.is_running = False
+        self.janitor.stop()
         if self.thread:
             self.thread.join(timeout=1.0)
             self.thread = None
     
+    def set_cleanup_hours(self, hours):
+        """Đổi thời gian giữ trigger (gọi từ main thread)."""
+        self.janitor.hours = hours
+    
+    def set_exchange_quota(self, max_size_mb, max_age_hours):
+        """Đổi quota của các file export (gọi từ main thread)."""
+        self.janitor.max_bytes = max_size_mb * 1024 * 1024
+        self.janitor.max_age_hours = max_age_hours
+    
     def _run_watcher(self):
         """Hàm chính để theo dõi thư mục."""
         if not os.path.exists(self.exchange_folder):
@@ -56,68 +243,63 @@ class FileWatcher:
         
         error_cooldown = 10  # seconds between error reports
         
-        while self.is_running:
-            try:
-                self._check_for_triggers(trigger_folder)
-                
-                # Dọn dẹp các file cũ nếu cần
+        # inotify trên Linux, polling thích ứng trên các hệ khác
+        waiter = folder_events.create_waiter(trigger_folder)
+        print(f"File watcher backend: {type(waiter).__name__}")
+        
+        # Xử lý các trigger đã có sẵn trước khi bắt đầu theo dõi
+        changed = True
+        last_scan = 0.0
+        
+        try:
+            while self.is_running:
                 try:
-                    # Kiểm tra context có sẵn không
-                    if hasattr(bpy, "context") and bpy.context:
-                        prefs = preferences.get_preferences(bpy.context)
-                        # Kiểm tra xem prefs có thuộc tính cleanup_interval không
-                        if prefs and hasattr(prefs, "cleanup_interval"):
-                            file_utils.cleanup_old_triggers(self.exchange_folder, prefs.cleanup_interval)
-                        else:
-                            # Fallback to default cleanup interval
-                            file_utils.cleanup_old_triggers(self.exchange_folder, 24)
-                    else:
-                        # Fallback to default cleanup interval
-                        file_utils.cleanup_old_triggers(self.exchange_folder, 24)
+                    now = time.monotonic()
+                    # Quét lại định kỳ phòng trường hợp bỏ lỡ sự kiện
+                    if changed or now - last_scan >= self.rescan_interval:
+                        self._check_for_triggers(trigger_folder)
+                        last_scan = now
+                    
+                    # Chờ sự kiện, timeout ngắn để stop() phản hồi nhanh
+                    changed = waiter.wait(0.5)
+                    
+                    # Yêu cầu không có trả lời không được chờ mãi
+                    _requests.expire()
                 except Exception as e:
-                    # Only log cleanup errors occasionally to avoid spamming
                     current_time = time.time()
                     if current_time - self.last_error_time > error_cooldown:
-                        self._log_error(f"Cleanup error: {e}")
+                        self._log_error(f"File watcher error: {e}")
                         self.last_error_time = current_time
-                    
-                    # Fallback to default cleanup interval
-                    file_utils.cleanup_old_triggers(self.exchange_folder, 24)
-                
-                time.sleep(1.0)  # Kiểm tra mỗi giây
-            except Exception as e:
-                current_time = time.time()
-                if current_time - self.last_error_time > error_cooldown:
-                    self._log_error(f"File watcher error: {e}")
-                    self.last_error_time = current_time
-                time.sleep(5.0)  # Longer delay after error
+                    time.sleep(5.0)  # Longer delay after error
+                    changed = True
+        finally:
+            waiter.close()
     
     def _check_for_triggers(self, folder):
         """Kiểm tra và xử lý các file trigger."""
         if not os.path.exists(folder):
             return
         
-        for filename in os.listdir(folder):
-            if not filename.startswith("trigger_") or not filename.endswith(".json"):
-                continue
-            
+        # Xử lý theo thứ tự ghi (milliseconds, pid, sequence)
+        filenames = [name for name in os.listdir(folder)
+                     if name.startswith("trigger_") and name.endswith(".json")]
+        filenames.sort(key=lambda name: file_utils.trigger_sort_key(os.path.join(folder, name)))
+        
+        for filename in filenames:
             filepath = os.path.join(folder, filename)
+            sequence_id = file_utils.trigger_sequence_id(filename)
             
             # Bỏ qua nếu đã xử lý
-            if filepath in self.processed_files:
+            if sequence_id in self.processed_files:
                 continue
             
-            # Kiểm tra xem file có đang được ghi không
             try:
-                # Thử mở file với mode 'a+' để kiểm tra xem nó có bị lock không
-                with open(filepath, 'a+') as f:
-                    # Di chuyển con trỏ về đầu file
-                    f.seek(0)
-                    # Đọc file trigger
+                # Trigger được ghi bằng os.replace nên file luôn hoàn chỉnh
+                with open(filepath, 'r') as f:
                     trigger_data = json.load(f)
                 
                 # Đánh dấu đã xử lý
-                self.processed_files.add(filepath)
+                self.processed_files.add(sequence_id)
                 
                 # Gọi callback để xử lý
                 if self.callback:
@@ -126,17 +308,23 @@ class FileWatcher:
                 # Đánh dấu file đã xử lý (đổi tên thay vì xóa)
                 file_utils.mark_trigger_as_processed(filepath)
             except json.JSONDecodeError as e:
+                # File vừa được tạo có thể chưa ghi xong, thử lại ở lần quét sau
+                try:
+                    if time.time() - os.path.getmtime(filepath) < self.partial_write_grace:
+                        continue
+                except OSError:
+                    continue
                 print(f"Invalid JSON in file {filepath}: {e}")
                 # Đánh dấu file bị lỗi
-                self.processed_files.add(filepath)
+                self.processed_files.add(sequence_id)
                 file_utils.mark_trigger_as_processed(filepath)
             except (OSError, PermissionError) as e:
-                # File đang được ghi, bỏ qua
+                # File đã bị xử lý hoặc xóa, bỏ qua
                 pass
             except Exception as e:
                 print(f"Error processing trigger file {filepath}: {e}")
                 # Đánh dấu file bị lỗi
-                self.processed_files.add(filepath)
+                self.processed_files.add(sequence_id)
                 file_utils.mark_trigger_as_processed(filepath)
     
     def _log_error(self, message):
@@ -154,6 +342,82 @@ class FileWatcher:
         except:
             pass  # Bỏ qua nếu không thành công
 
+def _write_standin_triggers(folder, start, count):
+    """Ghi trigger với tên {millis}_{pid}_{seq} như khi gửi thật (dùng cho soak test)."""
+    for i in range(start, start + count):
+        filename, sequence = file_utils.next_trigger_name("soak_test")
+        trigger_data = file_utils.build_trigger_data(
+            "soak_test", {"fbx_path": os.path.join(folder, f"cascadeur_to_blender_{i}.fbx")}, sequence)
+        with open(os.path.join(folder, filename), 'w') as f:
+            json.dump(trigger_data, f, indent=2)
+
+def soak_test(count=100000, batch=1000, max_entries=1024):
+    """Chạy FileWatcher qua count trigger và đo bộ nhớ theo thời gian.
+    
+    Gọi từ Python console của Blender: file_watcher.soak_test()
+    Trả về dict với số trigger đã xử lý và bộ nhớ (bytes) đầu/cuối/đỉnh.
+    """
+    import shutil
+    import tempfile
+    import tracemalloc
+    
+    exchange_folder = tempfile.mkdtemp(prefix="btc_soak_")
+    trigger_folder = os.path.join(exchange_folder, "blender_triggers")
+    os.makedirs(trigger_folder)
+    
+    received = [0]
+    def count_trigger(trigger_data):
+        received[0] += 1
+    
+    watcher = FileWatcher(exchange_folder, count_trigger)
+    watcher.processed_files = file_utils.ProcessedTriggerLog(max_entries)
+    
+    samples = []
+    tracemalloc.start()
+    try:
+        for start in range(0, count, batch):
+            _write_standin_triggers(trigger_folder, start, min(batch, count - start))
+            watcher._check_for_triggers(trigger_folder)
+            
+            # Xóa file đã xử lý để thư mục không phình ra trong lúc test
+            for filename in os.listdir(trigger_folder):
+                if filename.endswith(".processed"):
+                    os.remove(os.path.join(trigger_folder, filename))
+            
+            samples.append(tracemalloc.get_traced_memory()[0])
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        shutil.rmtree(exchange_folder, ignore_errors=True)
+    
+    # Bỏ mẫu đầu tiên (cấp phát lúc khởi động)
+    steady = samples[1:] or samples
+    result = {
+        "processed": received[0],
+        "tracked_ids": len(watcher.processed_files),
+        "first_bytes": steady[0],
+        "last_bytes": steady[-1],
+        "peak_bytes": peak,
+    }
+    print(f"Soak test: {result['processed']} triggers, {result['tracked_ids']} ids tracked, "
+          f"memory {result['first_bytes'] / 1024:.0f} KiB -> {result['last_bytes'] / 1024:.0f} KiB "
+          f"(peak {peak / 1024:.0f} KiB)")
+    return result
+
+# Watcher đang chạy (nếu có)
+_active_watcher = None
+
+def get_active_watcher():
+    return _active_watcher
+
+def stop_active_watcher():
+    """Dừng watcher đang chạy (khi gỡ add-on)."""
+    global _active_watcher
+    if _active_watcher:
+        _active_watcher.stop()
+        _active_watcher = None
+    _requests.cancel_all()
+
 # Timer handler để khởi động FileWatcher khi Blender bắt đầu
 @persistent
 def load_handler(dummy):
@@ -167,9 +431,19 @@ def load_handler(dummy):
             
         exchange_folder = preferences.get_exchange_folder(bpy.context)
         
+        # Đọc preferences ở main thread, janitor chỉ nhận giá trị
+        prefs = preferences.get_preferences(bpy.context)
+        cleanup_hours = getattr(prefs, "cleanup_interval", 24) if prefs else 24
+        max_size_mb = getattr(prefs, "exchange_max_size_mb", 0) if prefs else 0
+        max_age_hours = getattr(prefs, "exchange_max_age_hours", 0) if prefs else 0
+        
         # Khởi động watcher với callback xử lý trigger
-        watcher = FileWatcher(exchange_folder, process_trigger)
+        global _active_watcher
+        if _active_watcher:
+            _active_watcher.stop()
+        watcher = FileWatcher(exchange_folder, process_trigger, cleanup_hours, max_size_mb, max_age_hours)
         watcher.start()
+        _active_watcher = watcher
         
         # Lưu watcher vào WindowManager
         if not hasattr(bpy.types, "WindowManager"):
@@ -204,6 +478,11 @@ def process_trigger(trigger_data):
     
     print(f"Received trigger: {action}")
     
+    # Hoàn thành các yêu cầu mà trigger này trả lời
+    _requests.resolve(trigger_data)
+    if action == "request_done":
+        return
+    
     # Xử lý các hành động khác nhau - đảm bảo an toàn khi thêm vào hàng đợi
     if action == "import_scene":
         # Thêm vào hàng đợi xử lý của Blender
@@ -232,15 +511,36 @@ def process_import_scene(data):
         return None
     
     try:
-        # Import FBX
-        bpy.ops.import_scene.fbx(filepath=fbx_path)
-        print(f"Imported scene from {fbx_path}")
+        prefs = preferences.get_preferences(bpy.context)
+        armature = getattr(bpy.context.scene, "btc_armature", None)
+        
+        if prefs and getattr(prefs, "import_mode", 'FULL') == 'ACTION' and armature:
+            # Chỉ thay action của armature đã chọn, bỏ mọi dữ liệu khác của file
+            from . import action_import
+            result = action_import.import_action_only(fbx_path, armature)
+            message = (f"Updated animation of {armature.name} "
+                       f"({result['matched']}/{result['bones']} bones matched)")
+            print(f"{message} from {fbx_path}, discarded {result['removed']} imported data-blocks")
+        else:
+            from . import action_import, import_cleanup
+            cleanup = getattr(prefs, "import_cleanup", 'PURGE') if prefs else 'PURGE'
+            before = action_import.snapshot() if cleanup != 'OFF' else None
+            
+            # Import FBX
+            bpy.ops.import_scene.fbx(filepath=fbx_path)
+            message = "Imported scene from Cascadeur"
+            print(f"Imported scene from {fbx_path}")
+            
+            # Gộp mesh/material trùng và xóa dữ liệu mồ côi do lần import tạo ra
+            report = import_cleanup.run(before, cleanup)
+            if report["reclaimed_bytes"]:
+                message += f", reclaimed about {import_cleanup.format_size(report['reclaimed_bytes'])}"
         
         # Hiển thị thông báo thành công
         def show_message():
             if hasattr(bpy, "context") and bpy.context and hasattr(bpy.context, "window_manager"):
                 bpy.context.window_manager.popup_menu(
-                    lambda self, context: self.layout.label(text=f"Imported scene from Cascadeur"),
+                    lambda self, context: self.layout.label(text=message),
                     title="Import Successful", 
                     icon='INFO'
                 )
@@ -271,30 +571,29 @@ def process_import_all_scenes(data):
     if not fbx_paths:
         print("No FBX paths provided for import_all_scenes")
         return None
-        
-    success_count = 0
-    error_count = 0
-    
-    # Import each FBX one by one
-    for fbx_path in fbx_paths:
-        if not os.path.exists(fbx_path):
-            print(f"FBX file not found: {fbx_path}")
-            error_count += 1
-            continue
-            
-        try:
-            bpy.ops.import_scene.fbx(filepath=fbx_path)
-            print(f"Imported scene from {fbx_path}")
-            success_count += 1
-        except Exception as e:
-            print(f"Error importing scene from {fbx_path}: {e}")
-            error_count += 1
+    
+    # Chuẩn bị file trong thread pool, main thread chỉ import từng file một mỗi bước timer
+    from . import import_pipeline
+    prefs = preferences.get_preferences(bpy.context)
+    cleanup = getattr(prefs, "import_cleanup", 'PURGE') if prefs else 'PURGE'
+    import_pipeline.start_import(fbx_paths, on_finished=show_import_summary, cleanup=cleanup)
+    
+    return None  # Required for bpy.app.timers
+
+def show_import_summary(pipeline):
+    """Hiển thị kết quả của một ImportPipeline."""
+    from . import import_cleanup
+    success_count = pipeline.success_count
+    error_count = pipeline.error_count
+    reclaimed = pipeline.cleanup_report["reclaimed_bytes"] if pipeline.cleanup_report else 0
     
     # Display summary message
     def show_summary():
         message = f"Imported {success_count} scenes"
         if error_count > 0:
             message += f", {error_count} failed"
+        if reclaimed:
+            message += f", reclaimed about {import_cleanup.format_size(reclaimed)}"
             
         if hasattr(bpy, "context") and bpy.context and hasattr(bpy.context, "window_manager"):
             bpy.context.window_manager.popup_menu(
@@ -306,8 +605,6 @@ def process_import_all_scenes(data):
     
     if success_count > 0 or error_count > 0:
         bpy.app.timers.register(show_summary, first_interval=0.5)
-    
-    return None  # Required for bpy.app.timers
 
 def process_clean_keyframes(data):
     """Xử lý clean keyframes dựa trên JSON từ Cascadeur."""
@@ -335,16 +632,14 @@ def process_clean_keyframes(data):
         # Match keyframes in UI list
         scene = bpy.context.scene
         if hasattr(scene, "btc_keyframes"):
-            # Mark keyframes that exist in the received data
-            for item in scene.btc_keyframes:
-                item.is_marked = item.frame in keyframes
+            from . import timeline_utils, keyframe_scan
             
-            print(f"Updated {len(keyframes)} keyframes in UI")
+            # Mark keyframes that exist in the received data,
+            # timeline markers are synced once when the batch ends
+            with timeline_utils.batch_mark_edits(scene):
+                keyframe_scan.mark_only_frames(scene.btc_keyframes, keyframes)
             
-            # Cập nhật timeline markers nếu cần thiết
-            if hasattr(scene, "btc_show_markers") and scene.btc_show_markers:
-                from . import timeline_utils
-                timeline_utils.update_timeline_markers(scene)
+            print(f"Updated {len(keyframes)} keyframes in UI")
             
             # Show notification
             def show_notification():
@@ -0,0 +1,205 @@
+"""Wait for changes in the exchange trigger folders.
+
+Linux uses inotify through ctypes. Other platforms, or Linux systems
+where inotify is unavailable, poll the folder mtime with an interval
+that starts short and backs off while the folder is idle.
+
+This module has no bpy dependency so the latency benchmark can run in a
+plain Python interpreter:
+
+    python folder_events.py
+"""
+import os
+import sys
+import json
+import time
+import errno
+import select
+import tempfile
+import subprocess
+
+
+# inotify event masks (linux/inotify.h)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+
+class InotifyWaiter:
+    """Block until a file is written or moved into a folder (Linux only)."""
+
+    def __init__(self, folder):
+        import ctypes
+        import ctypes.util
+
+        self.folder = folder
+        libc_name = ctypes.util.find_library("c") or "libc.so.6"
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+
+        # IN_NONBLOCK and IN_CLOEXEC share their values with O_NONBLOCK and O_CLOEXEC
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, f"inotify_init1 failed: {os.strerror(err)}")
+
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            os.close(self._fd)
+            self._fd = -1
+            raise OSError(err, f"inotify_add_watch failed for {folder}: {os.strerror(err)}")
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds. Returns True if the folder changed."""
+        if self._fd < 0:
+            time.sleep(timeout)
+            return False
+
+        try:
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+        except InterruptedError:
+            return False
+        if not readable:
+            return False
+
+        # Drain all queued events, their content is not needed
+        while True:
+            try:
+                if not os.read(self._fd, 65536):
+                    break
+            except BlockingIOError:
+                break
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                break
+        return True
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWaiter:
+    """Poll the folder mtime, backing off while nothing changes."""
+
+    def __init__(self, folder, min_interval=0.01, max_interval=1.0, backoff=1.5):
+        self.folder = folder
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.interval = min_interval
+        self._last_mtime = self._mtime()
+
+    def _mtime(self):
+        try:
+            return os.stat(self.folder).st_mtime_ns
+        except OSError:
+            return None
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds. Returns True if the folder changed."""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.interval, remaining))
+
+            mtime = self._mtime()
+            if mtime != self._last_mtime:
+                self._last_mtime = mtime
+                self.interval = self.min_interval
+                return True
+
+            # Nothing new, poll less often
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+
+    def close(self):
+        pass
+
+
+def create_waiter(folder, use_inotify=True):
+    """Return the best available waiter for folder."""
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            return InotifyWaiter(folder)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable, falling back to polling: {e}")
+    return PollingWaiter(folder)
+
+
+# Fake writer used by the benchmark: writes one trigger per interval,
+# stamped with the time it was published.
+_WRITER_SCRIPT = r"""
+import json, os, sys, time
+folder, count, interval = sys.argv[1], int(sys.argv[2]), float(sys.argv[3])
+for i in range(count):
+    time.sleep(interval)
+    tmp = os.path.join(folder, f".bench_{i}.tmp")
+    with open(tmp, "w") as f:
+        json.dump({"action": "benchmark", "index": i, "written": time.time()}, f)
+    os.replace(tmp, os.path.join(folder, f"trigger_benchmark_{i:06d}.json"))
+"""
+
+
+def benchmark_trigger_latency(count=50, interval=0.05, use_inotify=True, idle_seconds=2.0):
+    """Measure trigger pickup latency against a separate writer process.
+
+    Returns a dict with the backend name, latency percentiles in
+    milliseconds and the CPU time used while idle.
+    """
+    with tempfile.TemporaryDirectory(prefix="btc_latency_") as folder:
+        waiter = create_waiter(folder, use_inotify)
+        backend = type(waiter).__name__
+        try:
+            # CPU used while nothing happens
+            cpu_start = time.process_time()
+            idle_end = time.monotonic() + idle_seconds
+            while time.monotonic() < idle_end:
+                waiter.wait(idle_end - time.monotonic())
+            idle_cpu_ms = (time.process_time() - cpu_start) * 1000.0
+
+            writer = subprocess.Popen([sys.executable, "-c", _WRITER_SCRIPT,
+                                       folder, str(count), str(interval)])
+            latencies = []
+            seen = set()
+            deadline = time.monotonic() + count * interval + 10.0
+            while len(latencies) < count and time.monotonic() < deadline:
+                waiter.wait(0.5)
+                for filename in os.listdir(folder):
+                    if not filename.startswith("trigger_") or filename in seen:
+                        continue
+                    now = time.time()
+                    seen.add(filename)
+                    with open(os.path.join(folder, filename)) as f:
+                        latencies.append((now - json.load(f)["written"]) * 1000.0)
+            writer.wait(timeout=10)
+        finally:
+            waiter.close()
+
+    latencies.sort()
+
+    def percentile(p):
+        if not latencies:
+            return float("nan")
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    result = {
+        "backend": backend,
+        "received": len(latencies),
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "max_ms": latencies[-1] if latencies else float("nan"),
+        "idle_cpu_ms": idle_cpu_ms,
+    }
+    print(f"{backend}: {result['received']}/{count} triggers, "
+          f"p50 {result['p50_ms']:.1f} ms, p95 {result['p95_ms']:.1f} ms, "
+          f"max {result['max_ms']:.1f} ms, idle CPU {idle_cpu_ms:.1f} ms over {idle_seconds:.0f} s")
+    return result
+
+
+if __name__ == "__main__":
+    benchmark_trigger_latency(use_inotify=True)
+    benchmark_trigger_latency(use_inotify=False)
@@ -0,0 +1,278 @@
+"""Post-import cleanup stage for scenes imported from Cascadeur.
+
+Meshes and materials created by an import that are identical to one
+already in the file are remapped to it, then data-blocks created by the
+import that ended up without users are removed. Only data created by the
+import is touched; use action_import.snapshot() before importing.
+
+Modes (preference import_cleanup):
+    'OFF'    nothing is done
+    'PURGE'  remove orphans created by the import
+    'DEDUPE' merge identical meshes and materials, then purge
+"""
+import hashlib
+import numpy as np
+import bpy
+from . import action_import
+from .exchange_store import hash_collection
+
+# Rough per-element sizes used to estimate the memory reclaimed (bytes)
+ID_BYTES = 1024
+VERTEX_BYTES = 16
+EDGE_BYTES = 8
+LOOP_BYTES = 8
+POLYGON_BYTES = 12
+KEYFRAME_BYTES = 40
+
+# Mesh attribute data type -> (foreach_get property, values per element, dtype)
+ATTRIBUTE_LAYOUTS = {
+    'FLOAT': ("value", 1, np.float32),
+    'INT': ("value", 1, np.int32),
+    'INT8': ("value", 1, np.int32),
+    'BOOLEAN': ("value", 1, bool),
+    'FLOAT2': ("vector", 2, np.float32),
+    'FLOAT_VECTOR': ("vector", 3, np.float32),
+    'INT32_2D': ("value", 2, np.int32),
+    'FLOAT_COLOR': ("color", 4, np.float32),
+    'BYTE_COLOR': ("color", 4, np.float32),
+    'QUATERNION': ("value", 4, np.float32),
+    'FLOAT4X4': ("value", 16, np.float32),
+}
+
+# Removal order: users before the data they use
+PURGE_ORDER = (
+    "objects", "meshes", "curves", "armatures", "cameras", "lights", "materials",
+    "node_groups", "textures", "images", "actions",
+)
+
+
+def _vertex_group_names(mesh):
+    """Vertex group names of the objects using mesh, None if they differ.
+
+    Deform weights refer to groups by index, the names live on the objects.
+    """
+    names = {tuple(group.name for group in obj.vertex_groups)
+             for obj in bpy.data.objects if obj.data == mesh}
+    if len(names) > 1:
+        return None
+    return names.pop() if names else ()
+
+
+def _hash_deform_weights(digest, mesh):
+    indices = []
+    weights = []
+    for vertex in mesh.vertices:
+        for element in vertex.groups:
+            indices.append((vertex.index, element.group))
+            weights.append(element.weight)
+    digest.update(np.array(indices, dtype=np.int32).tobytes())
+    digest.update(np.array(weights, dtype=np.float32).tobytes())
+
+
+def _hash_custom_normals(digest, mesh):
+    digest.update(repr((getattr(mesh, "use_auto_smooth", None),
+                        getattr(mesh, "has_custom_normals", False))).encode("utf-8"))
+    if not getattr(mesh, "has_custom_normals", False):
+        return
+    if hasattr(mesh, "corner_normals"):
+        # Blender 4.1+
+        hash_collection(digest, mesh.corner_normals, "vector", 3)
+    else:
+        mesh.calc_normals_split()
+        hash_collection(digest, mesh.loops, "normal", 3)
+
+
+def _hash_attributes(digest, mesh):
+    """Every generic attribute: smooth/sharp flags, colors, creases, material indices..."""
+    for attribute in sorted(mesh.attributes, key=lambda a: a.name):
+        digest.update(f"{attribute.name}:{attribute.domain}:{attribute.data_type};".encode("utf-8"))
+        layout = ATTRIBUTE_LAYOUTS.get(attribute.data_type)
+        if layout is None:
+            # e.g. STRING: no bulk access, compare per item
+            digest.update(repr([getattr(item, "value", None) for item in attribute.data]).encode("utf-8"))
+            continue
+        prop, width, dtype = layout
+        hash_collection(digest, attribute.data, prop, width, dtype)
+
+
+def mesh_hash(mesh):
+    """Content hash of a mesh, None if it should never be merged.
+
+    Covers geometry, every attribute (UVs, colors, smooth flags...),
+    custom split normals, deform weights with the vertex group names of
+    the objects using it, and material names. Meshes with shape keys or
+    used by objects with different vertex groups are not merged.
+    """
+    if mesh.shape_keys:
+        return None
+    group_names = _vertex_group_names(mesh)
+    if group_names is None:
+        return None
+    digest = hashlib.sha256()
+    digest.update(np.array([len(mesh.vertices), len(mesh.edges), len(mesh.loops), len(mesh.polygons)],
+                           dtype=np.int64).tobytes())
+    hash_collection(digest, mesh.vertices, "co", 3)
+    hash_collection(digest, mesh.edges, "vertices", 2, np.int32)
+    hash_collection(digest, mesh.loops, "vertex_index", 1, np.int32)
+    hash_collection(digest, mesh.polygons, "loop_total", 1, np.int32)
+    for uv_layer in mesh.uv_layers:
+        digest.update(uv_layer.name.encode("utf-8"))
+        hash_collection(digest, uv_layer.data, "uv", 2)
+    for material in mesh.materials:
+        digest.update((material.name if material else "").encode("utf-8"))
+    _hash_attributes(digest, mesh)
+    _hash_custom_normals(digest, mesh)
+    digest.update(repr(group_names).encode("utf-8"))
+    _hash_deform_weights(digest, mesh)
+    return digest.hexdigest()
+
+
+def _socket_value(socket):
+    value = getattr(socket, "default_value", None)
+    try:
+        return tuple(round(v, 6) for v in value)
+    except TypeError:
+        return round(value, 6) if isinstance(value, float) else value
+
+
+def material_hash(material):
+    """Content hash of a material's settings and node tree, independent of its name."""
+    description = [
+        tuple(round(v, 6) for v in material.diffuse_color),
+        round(material.metallic, 6),
+        round(material.roughness, 6),
+        material.use_nodes,
+    ]
+    tree = material.node_tree if material.use_nodes else None
+    if tree:
+        for node in sorted(tree.nodes, key=lambda n: n.name):
+            image = getattr(node, "image", None)
+            group = getattr(node, "node_tree", None)
+            description.append((node.bl_idname, node.name,
+                                (image.filepath or image.name) if image else None,
+                                group.name if group else None,
+                                [(s.identifier, _socket_value(s)) for s in node.inputs if not s.is_linked]))
+        description.append(sorted((link.from_node.name, link.from_socket.identifier,
+                                   link.to_node.name, link.to_socket.identifier) for link in tree.links))
+    return hashlib.sha256(repr(description).encode("utf-8")).hexdigest()
+
+
+def estimate_size(collection_name, block):
+    """Rough memory used by a data-block, in bytes."""
+    size = ID_BYTES
+    try:
+        if collection_name == "meshes":
+            size += (len(block.vertices) * VERTEX_BYTES + len(block.edges) * EDGE_BYTES
+                     + len(block.loops) * LOOP_BYTES * (1 + len(block.uv_layers))
+                     + len(block.polygons) * POLYGON_BYTES)
+        elif collection_name == "images" and block.has_data:
+            width, height = block.size
+            size += width * height * block.channels * (4 if block.is_float else 1)
+        elif collection_name == "actions":
+            size += sum(len(fcurve.keyframe_points) for fcurve in getattr(block, "fcurves", [])) * KEYFRAME_BYTES
+    except (AttributeError, ReferenceError):
+        pass
+    return size
+
+
+def mesh_size_key(mesh):
+    return len(mesh.vertices), len(mesh.polygons)
+
+
+def dedupe(created, collection_name, hash_function, size_key=None):
+    """Remap created data-blocks to an identical existing one.
+
+    The first data-block with a given hash is kept; existing data comes
+    before data created by the import. size_key, when given, is a cheap
+    key used to skip hashing blocks no created block can match. Returns
+    the number remapped, the duplicates are left without users for
+    purge_orphans.
+    """
+    new_blocks = created.get(collection_name, [])
+    created_pointers = {block.as_pointer() for block in new_blocks}
+    if not created_pointers:
+        return 0
+    size_keys = {size_key(block) for block in new_blocks} if size_key else None
+
+    collection = getattr(bpy.data, collection_name)
+    blocks = sorted(collection, key=lambda block: block.as_pointer() in created_pointers)
+    originals = {}
+    remapped = 0
+    for block in blocks:
+        if block.library or (size_keys is not None and size_key(block) not in size_keys):
+            continue
+        content_hash = hash_function(block)
+        if content_hash is None:
+            continue
+        original = originals.setdefault(content_hash, block)
+        if original is not block and block.as_pointer() in created_pointers:
+            block.user_remap(original)
+            remapped += 1
+    return remapped
+
+
+def purge_orphans(created):
+    """Remove data-blocks created by the import that have no users.
+
+    Repeats until nothing more is removed, since removing a block can
+    leave the data it used without users. Returns (removed, bytes).
+    """
+    removed = 0
+    reclaimed = 0
+    changed = True
+    while changed:
+        changed = False
+        for collection_name in PURGE_ORDER:
+            collection = getattr(bpy.data, collection_name, None)
+            blocks = created.get(collection_name)
+            if collection is None or not blocks:
+                continue
+            for block in list(blocks):
+                try:
+                    if block.users or block.use_fake_user:
+                        continue
+                    size = estimate_size(collection_name, block)
+                    collection.remove(block)
+                except ReferenceError:
+                    pass
+                else:
+                    removed += 1
+                    reclaimed += size
+                    changed = True
+                blocks.remove(block)
+    return removed, reclaimed
+
+
+def run(before, mode='PURGE'):
+    """Clean up after an import started when snapshot before was taken.
+
+    Args:
+        before: action_import.snapshot() taken before the import
+        mode: 'OFF', 'PURGE' or 'DEDUPE'
+
+    Returns:
+        Dict with the number of deduplicated and removed data-blocks and
+        the estimated bytes reclaimed
+    """
+    report = {"deduped": 0, "removed": 0, "reclaimed_bytes": 0}
+    if mode == 'OFF' or before is None:
+        return report
+
+    created = action_import.new_datablocks(before)
+    if mode == 'DEDUPE':
+        # Materials first so meshes using merged materials hash the same
+        report["deduped"] += dedupe(created, "materials", material_hash)
+        report["deduped"] += dedupe(created, "meshes", mesh_hash, mesh_size_key)
+    report["removed"], report["reclaimed_bytes"] = purge_orphans(created)
+
+    print(f"Import cleanup: merged {report['deduped']} duplicates, removed {report['removed']} "
+          f"orphan data-blocks, about {format_size(report['reclaimed_bytes'])} reclaimed")
+    return report
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} GB"
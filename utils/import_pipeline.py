@@ -0,0 +1,205 @@
+import os
+import time
+import struct
+import concurrent.futures
+import bpy
+from . import action_import, import_cleanup
+
+# Binary FBX files start with this magic followed by a uint32 version
+FBX_BINARY_MAGIC = b"Kaydara FBX Binary  \x00"
+
+# Chunk size used to pull files into the OS cache before importing
+_PREFETCH_CHUNK = 4 * 1024 * 1024
+
+# Interval between two main thread steps (seconds)
+STEP_INTERVAL = 0.05
+
+
+def prepare_file(fbx_path):
+    """Per-file preparation, safe to run off the main thread.
+
+    Checks the file, reads the FBX header and pulls the whole file into
+    the OS cache so the main thread import does not wait on the disk.
+    Returns a dict describing the file; "error" is set when it cannot be
+    imported.
+    """
+    info = {"path": fbx_path, "error": None, "size": 0, "binary": False, "version": None,
+            "prepare_ms": 0.0}
+    start = time.perf_counter()
+    try:
+        if not fbx_path or not os.path.isfile(fbx_path):
+            info["error"] = "file not found"
+            return info
+
+        info["size"] = os.path.getsize(fbx_path)
+        with open(fbx_path, 'rb') as f:
+            header = f.read(len(FBX_BINARY_MAGIC) + 6)
+            if header.startswith(FBX_BINARY_MAGIC):
+                info["binary"] = True
+                info["version"] = struct.unpack_from("<I", header, len(FBX_BINARY_MAGIC) + 2)[0]
+            elif b"FBX" not in header and not header.lstrip().startswith(b";"):
+                info["error"] = "not an FBX file"
+                return info
+
+            # Read the rest so the importer finds it in the OS cache
+            while f.read(_PREFETCH_CHUNK):
+                pass
+    except OSError as e:
+        info["error"] = str(e)
+    finally:
+        info["prepare_ms"] = (time.perf_counter() - start) * 1000.0
+    return info
+
+
+class ImportPipeline:
+    """Import a batch of FBX files without locking Blender for the whole batch.
+
+    Files are prepared in a thread pool; the main thread imports one
+    prepared file per bpy.app.timers step, in the original order, and
+    reports progress between steps. The import_cleanup stage runs with
+    the given mode right after each file, within the same timer step, so
+    data the user creates between steps is never treated as imported.
+    """
+
+    def __init__(self, fbx_paths, on_finished=None, max_workers=4, cleanup='PURGE'):
+        self.fbx_paths = list(fbx_paths)
+        self.on_finished = on_finished
+        self.max_workers = max(1, min(max_workers, len(self.fbx_paths)))
+        self.success_count = 0
+        self.error_count = 0
+        self.timings = []
+        self.cleanup = cleanup
+        self.cleanup_report = None
+        self._executor = None
+        self._futures = []
+        self._next = 0
+        self._started = 0.0
+        self._progress_started = False
+        self._finished = False
+        # Blender compares timer functions by identity, keep one bound method
+        self._timer = self.step
+
+    @property
+    def total(self):
+        return len(self.fbx_paths)
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="btc_import_prep")
+        self._futures = [self._executor.submit(prepare_file, path) for path in self.fbx_paths]
+
+        try:
+            bpy.context.window_manager.progress_begin(0, self.total)
+            self._progress_started = True
+        except AttributeError:
+            pass
+
+        bpy.app.timers.register(self._timer, first_interval=0.0)
+        return self
+
+    def step(self):
+        """Timer step: import at most one prepared file."""
+        if self._finished:
+            return None
+        if self._next >= self.total:
+            self.finish()
+            return None
+
+        future = self._futures[self._next]
+        if not future.done():
+            # Prep of the next file still running, check again shortly
+            return STEP_INTERVAL
+
+        info = future.result()
+        self._next += 1
+        self.import_file(info)
+        self.report_progress()
+
+        if self._next >= self.total:
+            self.finish()
+            return None
+        return 0.0
+
+    def import_file(self, info):
+        fbx_path = info["path"]
+        if info["error"]:
+            print(f"Skipping {fbx_path}: {info['error']}")
+            self.error_count += 1
+            return
+
+        start = time.perf_counter()
+        before = action_import.snapshot() if self.cleanup != 'OFF' else None
+        try:
+            bpy.ops.import_scene.fbx(filepath=fbx_path)
+            print(f"Imported scene from {fbx_path}")
+            self.success_count += 1
+        except Exception as e:
+            print(f"Error importing scene from {fbx_path}: {e}")
+            self.error_count += 1
+
+        if before is not None:
+            report = import_cleanup.run(before, self.cleanup)
+            if self.cleanup_report is None:
+                self.cleanup_report = report
+            else:
+                for key, value in report.items():
+                    self.cleanup_report[key] += value
+        import_ms = (time.perf_counter() - start) * 1000.0
+        self.timings.append((fbx_path, info["size"], info["prepare_ms"], import_ms))
+
+    def report_progress(self):
+        if self._progress_started:
+            try:
+                bpy.context.window_manager.progress_update(self._next)
+            except AttributeError:
+                pass
+        print(f"Import progress: {self._next}/{self.total}")
+
+    def finish(self):
+        if self._finished:
+            return
+        self._finished = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        if self._progress_started:
+            try:
+                bpy.context.window_manager.progress_end()
+            except AttributeError:
+                pass
+            self._progress_started = False
+
+        total_ms = (time.perf_counter() - self._started) * 1000.0
+        main_ms = sum(t[3] for t in self.timings)
+        print(f"Imported {self.success_count}/{self.total} scenes in {total_ms:.0f} ms "
+              f"({main_ms:.0f} ms on the main thread)")
+
+        _active_pipelines.discard(self)
+        if self.on_finished:
+            self.on_finished(self)
+
+    def cancel(self):
+        """Stop before the next file; files already imported stay."""
+        if bpy.app.timers.is_registered(self._timer):
+            bpy.app.timers.unregister(self._timer)
+        for future in self._futures[self._next:]:
+            future.cancel()
+        self._next = self.total
+        self.finish()
+
+
+# Pipelines that are still importing
+_active_pipelines = set()
+
+
+def start_import(fbx_paths, on_finished=None, max_workers=4, cleanup='PURGE'):
+    """Start importing fbx_paths in the background, returns the ImportPipeline."""
+    pipeline = ImportPipeline(fbx_paths, on_finished, max_workers, cleanup)
+    _active_pipelines.add(pipeline)
+    return pipeline.start()
+
+
+def cancel_all():
+    for pipeline in list(_active_pipelines):
+        pipeline.cancel()
@@ -0,0 +1,151 @@
+import time
+import numpy as np
+
+
+def scan_action_frames(action):
+    """Return sorted unique integer frames holding a keyframe in the action.
+
+    Every fcurve's ``co`` is pulled into one float32 buffer with
+    ``foreach_get`` so the scan never touches keyframes one by one.
+    """
+    if not action:
+        return np.empty(0, dtype=np.int64)
+
+    fcurves = action.fcurves
+    counts = [len(fcurve.keyframe_points) for fcurve in fcurves]
+    total = sum(counts)
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # co is stored as (frame, value) pairs
+    buffer = np.empty(total * 2, dtype=np.float32)
+    offset = 0
+    for fcurve, count in zip(fcurves, counts):
+        if count == 0:
+            continue
+        end = offset + count * 2
+        fcurve.keyframe_points.foreach_get("co", buffer[offset:end])
+        offset = end
+
+    # astype truncates toward zero, same as int(keyframe.co[0])
+    return np.unique(buffer[0::2].astype(np.int64))
+
+
+def scan_action_frames_loop(action):
+    """Reference implementation: walk keyframes one at a time in Python."""
+    keyframes = set()
+    if action:
+        for fcurve in action.fcurves:
+            for keyframe in fcurve.keyframe_points:
+                keyframes.add(int(keyframe.co[0]))
+    return sorted(keyframes)
+
+
+def get_armature_action(armature):
+    """Return the active action of an armature, or None."""
+    if armature and armature.animation_data and armature.animation_data.action:
+        return armature.animation_data.action
+    return None
+
+
+def fill_keyframe_list(scene, frames, marked_frames=None):
+    """Rebuild scene.btc_keyframes from an array of frames.
+
+    Items are allocated first and their fields written in bulk with
+    ``foreach_set``, which also keeps the per-item ``is_marked`` update
+    callback from firing. Callers are responsible for refreshing markers.
+    """
+    keyframes = scene.btc_keyframes
+    keyframes.clear()
+
+    frames = np.asarray(frames, dtype=np.int64)
+    count = len(frames)
+    if count == 0:
+        return 0
+
+    for _ in range(count):
+        keyframes.add()
+
+    if marked_frames:
+        marked = np.isin(frames, np.fromiter(marked_frames, dtype=np.int64))
+    else:
+        marked = np.zeros(count, dtype=bool)
+
+    keyframes.foreach_set("frame", frames.astype(np.int32))
+    keyframes.foreach_set("is_marked", marked)
+    return count
+
+
+def read_keyframe_list(keyframes):
+    """Return (frames, marked) arrays for a btc_keyframes collection."""
+    count = len(keyframes)
+    frames = np.empty(count, dtype=np.int32)
+    marked = np.empty(count, dtype=bool)
+    if count:
+        keyframes.foreach_get("frame", frames)
+        keyframes.foreach_get("is_marked", marked)
+    return frames, marked
+
+
+def write_marked_mask(keyframes, marked):
+    """Write is_marked for every item at once. Returns how many items changed.
+
+    ``foreach_set`` does not run the per-item update callback, so this is
+    meant to be used inside ``timeline_utils.batch_mark_edits``.
+    """
+    _, current = read_keyframe_list(keyframes)
+    marked = np.asarray(marked, dtype=bool)
+    changed = int(np.count_nonzero(current != marked))
+    if changed:
+        keyframes.foreach_set("is_marked", marked)
+    return changed
+
+
+def set_all_marked(keyframes, value):
+    """Mark or clear every item. Returns how many items changed."""
+    return write_marked_mask(keyframes, np.full(len(keyframes), bool(value)))
+
+
+def mark_only_frames(keyframes, frames):
+    """Mark items whose frame is in frames and clear all others."""
+    item_frames, _ = read_keyframe_list(keyframes)
+    wanted = np.fromiter(frames, dtype=np.int64)
+    return write_marked_mask(keyframes, np.isin(item_frames, wanted))
+
+
+def benchmark_scan(action, repeat=5):
+    """Compare the vectorized scan with the per-keyframe loop.
+
+    Run from Blender's Python console, e.g.
+    ``keyframe_scan.benchmark_scan(C.object.animation_data.action)``.
+    Returns a dict with the best time of each method in milliseconds.
+    """
+    def best_of(func):
+        best = float("inf")
+        result = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(action)
+            best = min(best, time.perf_counter() - start)
+        return best * 1000.0, result
+
+    loop_ms, loop_frames = best_of(scan_action_frames_loop)
+    vector_ms, vector_frames = best_of(scan_action_frames)
+
+    if list(loop_frames) != vector_frames.tolist():
+        print("Keyframe scan benchmark: results differ between methods")
+
+    keyframe_count = sum(len(fcurve.keyframe_points) for fcurve in action.fcurves)
+    speedup = loop_ms / vector_ms if vector_ms > 0 else float("inf")
+    print(f"Keyframe scan: {len(action.fcurves)} fcurves, {keyframe_count} keys, "
+          f"{len(vector_frames)} unique frames")
+    print(f"  loop:        {loop_ms:.2f} ms")
+    print(f"  foreach_get: {vector_ms:.2f} ms ({speedup:.1f}x)")
+
+    return {
+        "fcurves": len(action.fcurves),
+        "keyframes": keyframe_count,
+        "frames": len(vector_frames),
+        "loop_ms": loop_ms,
+        "vector_ms": vector_ms,
+    }
@@ -0,0 +1,171 @@
+import bpy
+import numpy as np
+from . import preferences, keyframe_scan
+
+# Scene custom properties holding the compact storage.
+# Both are flat int arrays of (start, length) runs.
+MARKED_RUNS_PROP = "btc_marked_runs"
+LISTED_RUNS_PROP = "btc_listed_runs"
+
+
+def encode_runs(frames):
+    """Encode frames as a flat [start, length, start, length, ...] list."""
+    frames = np.unique(np.asarray(list(frames), dtype=np.int64))
+    if len(frames) == 0:
+        return []
+
+    # A new run starts wherever two consecutive frames are not adjacent
+    breaks = np.flatnonzero(np.diff(frames) != 1) + 1
+    starts = frames[np.concatenate(([0], breaks))]
+    ends = frames[np.concatenate((breaks - 1, [len(frames) - 1]))]
+    return np.column_stack((starts, ends - starts + 1)).ravel().tolist()
+
+
+def decode_runs(runs):
+    """Decode a flat run list back into a sorted array of frames."""
+    runs = np.asarray(runs, dtype=np.int64).reshape(-1, 2)
+    if len(runs) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    starts, lengths = runs[:, 0], runs[:, 1]
+    total = int(lengths.sum())
+    # Offset of each frame inside its run
+    run_offsets = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + (np.arange(total) - run_offsets)
+
+
+def is_compact_storage_enabled(context=None):
+    """True if marks should be saved as runs instead of the item collection."""
+    prefs = preferences.get_preferences(context or bpy.context)
+    return bool(prefs) and getattr(prefs, "mark_storage", 'COLLECTION') == 'RUNS'
+
+
+def has_stored_runs(scene):
+    return LISTED_RUNS_PROP in scene
+
+
+def get_stored_marked_frames(scene):
+    """Marked frames from the compact storage (empty if there is none)."""
+    return decode_runs(scene.get(MARKED_RUNS_PROP, [])).tolist()
+
+
+def store_from_view(scene):
+    """Write the btc_keyframes view into the scene's run properties."""
+    frames, marked = keyframe_scan.read_keyframe_list(scene.btc_keyframes)
+    scene[LISTED_RUNS_PROP] = encode_runs(frames)
+    scene[MARKED_RUNS_PROP] = encode_runs(frames[marked])
+
+
+def build_view(scene, order=None):
+    """Rebuild btc_keyframes from the scene's run properties.
+
+    Runs do not keep the list order, so items come back sorted by frame
+    unless order (the frames as they were listed) is given.
+    """
+    from . import timeline_utils
+
+    listed = decode_runs(scene.get(LISTED_RUNS_PROP, []))
+    marked = get_stored_marked_frames(scene)
+
+    # Marked frames are always listed, even if added by hand
+    frames = np.union1d(listed, np.asarray(marked, dtype=np.int64))
+    if order is not None:
+        order = np.asarray(order, dtype=np.int64)
+        # Keep the listed order, anything not in it goes last
+        frames = np.concatenate((order[np.isin(order, frames)], frames[~np.isin(frames, order)]))
+    with timeline_utils.batch_mark_edits(scene):
+        keyframe_scan.fill_keyframe_list(scene, frames, marked)
+    return len(frames)
+
+
+def clear_stored_runs(scene):
+    for prop in (LISTED_RUNS_PROP, MARKED_RUNS_PROP):
+        if prop in scene:
+            del scene[prop]
+
+
+def migrate_scene(scene, compact=None):
+    """Bring a scene in line with the selected storage backend.
+
+    Files saved with the compact backend get their view rebuilt, and
+    collection-only files get their runs written so the next save can
+    drop the per-frame items.
+    """
+    if not hasattr(scene, "btc_keyframes"):
+        return
+    if compact is None:
+        compact = is_compact_storage_enabled()
+
+    view_is_empty = len(scene.btc_keyframes) == 0
+    if has_stored_runs(scene) and view_is_empty:
+        build_view(scene)
+    elif compact and not view_is_empty:
+        store_from_view(scene)
+
+    if not compact:
+        # Collection backend: the items are the only copy that is kept
+        clear_stored_runs(scene)
+
+
+@bpy.app.handlers.persistent
+def load_post_handler(*args):
+    """Migrate every scene of a freshly loaded file."""
+    compact = is_compact_storage_enabled()
+    for scene in bpy.data.scenes:
+        try:
+            migrate_scene(scene, compact)
+        except Exception as e:
+            print(f"Error migrating keyframe storage of {scene.name}: {e}")
+
+
+# Scenes whose view was emptied for the current save:
+# name -> (listed frames in list order, btc_keyframe_index)
+_detached_scenes = {}
+
+
+def _restore_detached_views():
+    while _detached_scenes:
+        name, (order, index) = _detached_scenes.popitem()
+        scene = bpy.data.scenes.get(name)
+        if scene is not None and len(scene.btc_keyframes) == 0 and has_stored_runs(scene):
+            build_view(scene, order)
+            # Manual order and selection survive the save
+            scene.btc_keyframe_index = index
+    return None  # Required for bpy.app.timers
+
+
+@bpy.app.handlers.persistent
+def save_pre_handler(*args):
+    """Store marks as runs and leave the per-frame items out of the .blend.
+
+    The open file keeps its list order and active item. Runs hold no
+    order, so the list of a reopened file is sorted by frame.
+    """
+    if not is_compact_storage_enabled():
+        return
+
+    for scene in bpy.data.scenes:
+        if not hasattr(scene, "btc_keyframes"):
+            continue
+        if len(scene.btc_keyframes) == 0:
+            # Nothing listed any more, drop runs from an earlier save
+            clear_stored_runs(scene)
+            continue
+        try:
+            order, _ = keyframe_scan.read_keyframe_list(scene.btc_keyframes)
+            index = scene.btc_keyframe_index
+            store_from_view(scene)
+            scene.btc_keyframes.clear()
+            _detached_scenes[scene.name] = (order, index)
+        except Exception as e:
+            print(f"Error storing keyframes of {scene.name}: {e}")
+
+    if _detached_scenes:
+        # Safety net in case save_post never runs (failed save)
+        bpy.app.timers.register(_restore_detached_views, first_interval=0.1)
+
+
+@bpy.app.handlers.persistent
+def save_post_handler(*args):
+    """Rebuild the views emptied by save_pre_handler."""
+    _restore_detached_views()
@@ -40,7 +40,26 @@ class BTCAddonPreferences(AddonPreferences):
         description="Automatically clean up processed trigger files older than this many hours",
         default=24,
         min=1,
-        max=168
+        max=168,
+        update=lambda self, context: update_cleanup_interval(self, context)
+    )
+    
+    # Giới hạn dung lượng các thư mục fbx/, json/ và store/ trong exchange folder
+    exchange_max_size_mb: IntProperty(
+        name="Exchange Size Limit (MB)",
+        description="Evict the least recently used exported files when the exchange folder grows past this size (0 = no limit)",
+        default=4096,
+        min=0,
+        update=lambda self, context: update_exchange_quota(self, context)
+    )
+    
+    # Tuổi tối đa của các file export trong exchange folder
+    exchange_max_age_hours: IntProperty(
+        name="Exported File Lifetime (hours)",
+        description="Evict exported files not used for this many hours (0 = keep until the size limit is reached)",
+        default=72,
+        min=0,
+        update=lambda self, context: update_exchange_quota(self, context)
     )
     
     # Tự động mở Cascadeur khi export
@@ -50,10 +69,65 @@ class BTCAddonPreferences(AddonPreferences):
         default=False
     )
     
-    # Port cho socket communication (fallback)
+    # Export FBX thẳng vào exchange folder thay vì qua thư mục tạm rồi sao chép
+    direct_export: BoolProperty(
+        name="Export Directly to Exchange Folder",
+        description="Write FBX exports straight into the exchange folder and publish them atomically, instead of exporting to the temp folder and copying",
+        default=True
+    )
+    
+    # Cách lưu keyframe đã đánh dấu trong file .blend
+    mark_storage: EnumProperty(
+        name="Marked Keyframe Storage",
+        items=[
+            ('COLLECTION', "Item List", "Save one list item per keyframe (compatible with older versions)"),
+            ('RUNS', "Compact Runs", "Save marked keyframes as run-length arrays and rebuild the list on load")
+        ],
+        default='COLLECTION',
+        description="How marked keyframes are stored in .blend files"
+    )
+    
+    # Gỡ frame_change handler khi ẩn timeline markers
+    detach_marker_handler: BoolProperty(
+        name="Pause Marker Handler When Hidden",
+        description="Unregister the frame change handler while timeline markers are hidden",
+        default=True
+    )
+    
+    # Import scene từ Cascadeur: cả file hoặc chỉ cập nhật action của armature
+    import_mode: EnumProperty(
+        name="Scene Import Mode",
+        items=[
+            ('FULL', "Full Scene", "Import everything in the FBX as new objects"),
+            ('ACTION', "Update Animation Only", "Apply the imported animation to the selected armature and discard the other imported data")
+        ],
+        default='FULL',
+        description="How scenes received from Cascadeur are imported"
+    )
+    
+    # Dọn dẹp sau khi import scene từ Cascadeur
+    import_cleanup: EnumProperty(
+        name="Post-import Cleanup",
+        items=[
+            ('OFF', "Off", "Keep everything the import created"),
+            ('PURGE', "Purge Orphans", "Remove data the import created that nothing uses"),
+            ('DEDUPE', "Merge Duplicates and Purge", "Reuse identical meshes and materials already in the file, then remove orphans")
+        ],
+        default='PURGE',
+        description="Cleanup stage run after scenes are imported from Cascadeur"
+    )
+    
+    # Gửi yêu cầu qua socket, file trigger chỉ dùng khi không kết nối được
+    use_socket_transport: BoolProperty(
+        name="Use Socket Transport",
+        description="Send requests to Cascadeur over a local socket and fall back to trigger files when it is not listening",
+        default=True
+    )
+    
+    # Port cho socket communication
     socket_port: IntProperty(
         name="Socket Port",
-        description="Port for socket communication (fallback method)",
+        description="Local port the Cascadeur add-on listens on",
         default=48152,
         min=1024,
         max=65535
@@ -125,18 +199,35 @@ class BTCAddonPreferences(AddonPreferences):
         # Cleanup settings
         row = box.row()
         row.prop(self, "cleanup_interval")
+        row = box.row()
+        row.prop(self, "exchange_max_size_mb")
+        row = box.row()
+        row.prop(self, "exchange_max_age_hours")
         
         # Options
         box = layout.box()
         box.label(text="Options:", icon="SETTINGS")
         row = box.row()
         row.prop(self, "auto_open_cascadeur")
+        row = box.row()
+        row.prop(self, "direct_export")
+        row = box.row()
+        row.prop(self, "detach_marker_handler")
+        row = box.row()
+        row.prop(self, "mark_storage")
+        row = box.row()
+        row.prop(self, "import_mode")
+        row = box.row()
+        row.prop(self, "import_cleanup")
         
         # Socket settings (fallback)
         box = layout.box()
         box.label(text="Advanced Settings:", icon="TOOL_SETTINGS")
         row = box.row()
+        row.prop(self, "use_socket_transport")
+        row = box.row()
         row.prop(self, "socket_port")
+        row.enabled = self.use_socket_transport
         
         # Installation
         box = layout.box()
@@ -170,6 +261,20 @@ classes = [
     BTCAddonPreferences,
 ]
 
+def update_cleanup_interval(self, context):
+    """Pass the new cleanup interval to the running trigger janitor"""
+    from . import file_watcher
+    watcher = file_watcher.get_active_watcher()
+    if watcher:
+        watcher.set_cleanup_hours(self.cleanup_interval)
+
+def update_exchange_quota(self, context):
+    """Pass the new exported file quota to the running trigger janitor"""
+    from . import file_watcher
+    watcher = file_watcher.get_active_watcher()
+    if watcher:
+        watcher.set_exchange_quota(self.exchange_max_size_mb, self.exchange_max_age_hours)
+
 def get_preferences(context):
     """Helper function to get add-on preferences"""
     try:
@@ -206,6 +311,15 @@ def get_exchange_folder(context):
     # Default to temp folder
     return os.path.join(tempfile.gettempdir(), "blender_to_cascadeur_exchange")
 
+def get_socket_port(context):
+    """Port for the socket transport, or None to use trigger files only"""
+    prefs = get_preferences(context)
+    if not prefs:
+        return get_port_number()
+    if not getattr(prefs, "use_socket_transport", True):
+        return None
+    return getattr(prefs, "socket_port", None) or get_port_number()
+
 def get_port_number():
     """Get the port number from preferences"""
     try:
@@ -0,0 +1,333 @@
+"""Loopback socket transport between the add-on and Cascadeur.
+
+Messages are UTF-8 JSON prefixed with their length as a 4 byte big-endian
+unsigned int. Every request gets exactly one reply on the same connection.
+
+Trigger messages carry the same payload as trigger files
+(file_utils.build_trigger_data), so the Cascadeur side handles both the
+same way. The listener writes every message to the trigger folder before
+acknowledging it, and when it does not acknowledge, send_trigger writes the
+trigger file itself.
+
+This module has no bpy dependency. The stand-in server answers like the
+Cascadeur listener and can be used to benchmark the round trip:
+
+    python socket_transport.py
+"""
+import os
+import json
+import time
+import socket
+import struct
+import tempfile
+import threading
+
+if __package__:
+    from . import file_utils
+else:
+    import file_utils
+
+
+DEFAULT_HOST = "127.0.0.1"
+
+# Length prefix of every message
+HEADER = struct.Struct("!I")
+MAX_MESSAGE_SIZE = 64 * 1024 * 1024
+
+# Loopback connects are refused immediately when nothing listens,
+# the timeout only matters for a hung listener
+CONNECT_TIMEOUT = 0.25
+REPLY_TIMEOUT = 5.0
+
+
+class TransportError(OSError):
+    """The message could not be delivered over the socket."""
+
+
+def send_message(sock, message):
+    """Send one length-prefixed JSON message."""
+    payload = json.dumps(message).encode("utf-8")
+    sock.sendall(HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    remaining = size
+    while remaining:
+        chunk = sock.recv(min(remaining, 1024 * 1024))
+        if not chunk:
+            raise ConnectionError("Connection closed while reading a message")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_message(sock):
+    """Receive one length-prefixed JSON message. Returns None if the peer closed."""
+    try:
+        header = _recv_exact(sock, HEADER.size)
+    except ConnectionError:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_MESSAGE_SIZE:
+        raise ValueError(f"Message too large: {size} bytes")
+    return json.loads(_recv_exact(sock, size).decode("utf-8"))
+
+
+class SocketClient:
+    """Keeps one connection to a listener open and reconnects when it drops."""
+
+    def __init__(self, port, host=DEFAULT_HOST):
+        self.port = port
+        self.host = host
+        self._sock = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=CONNECT_TIMEOUT)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(REPLY_TIMEOUT)
+        return sock
+
+    def request(self, message):
+        """Send a message and wait for the reply.
+
+        Raises TransportError if the message was not delivered. A listener
+        that took the message but did not answer in time returns None.
+        """
+        with self._lock:
+            # A kept connection may have been closed by the listener,
+            # retry once on a fresh one before giving up
+            for attempt in range(2):
+                reused = self._sock is not None
+                try:
+                    if self._sock is None:
+                        self._sock = self._connect()
+                    send_message(self._sock, message)
+                except OSError as e:
+                    self._close()
+                    if attempt:
+                        raise TransportError(f"Cannot reach listener on port {self.port}: {e}") from e
+                    continue
+
+                try:
+                    reply = recv_message(self._sock)
+                except (OSError, ValueError) as e:
+                    print(f"No reply from listener on port {self.port}: {e}")
+                    self._close()
+                    return None
+
+                if reply is None:
+                    # The listener always replies before closing, so nothing was handled
+                    self._close()
+                    if reused and not attempt:
+                        continue
+                    raise TransportError(f"Listener on port {self.port} closed the connection")
+                return reply
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+
+# One client per port, reused between requests
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(port, host=DEFAULT_HOST):
+    with _clients_lock:
+        client = _clients.get((host, port))
+        if client is None:
+            client = _clients[(host, port)] = SocketClient(port, host)
+        return client
+
+
+def close_clients():
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def is_listener_alive(port, host=DEFAULT_HOST):
+    """True if something accepts connections on the port."""
+    try:
+        with socket.create_connection((host, port), timeout=CONNECT_TIMEOUT):
+            return True
+    except OSError:
+        return False
+
+
+def send_trigger(exchange_folder, action, data=None, port=None, request_id=None):
+    """Deliver a trigger over the socket, or as a trigger file if that fails.
+
+    Args:
+        exchange_folder: Exchange directory used for the file fallback
+        action: Trigger action name
+        data: Dictionary with trigger data
+        port: Listener port, None to always use trigger files
+        request_id: Id echoed in Cascadeur's reply (generated if None)
+
+    Returns:
+        "socket" when the listener wrote the message as a trigger file,
+        the trigger file path when the file fallback was used, None on
+        failure
+    """
+    if not port:
+        return file_utils.create_trigger_file(exchange_folder, action, data, request_id)
+
+    message = file_utils.build_trigger_data(action, data, request_id=request_id)
+    return deliver(exchange_folder, message, port)[0]
+
+
+def deliver(exchange_folder, message, port):
+    """Deliver a prepared trigger payload over the socket, or as a trigger file.
+
+    Returns:
+        (result, reply): result as for send_trigger, reply is the
+        listener's acknowledgement or None when the file fallback was used
+    """
+    try:
+        reply = get_client(port).request(message)
+        if reply and reply.get("status") == "queued":
+            return "socket", reply
+        print(f"Listener did not store {message.get('action')}: {reply}, using trigger files")
+    except TransportError as e:
+        print(f"Socket transport unavailable, using trigger files: {e}")
+
+    # Same name as the listener would use, so a message it did store is not doubled
+    return file_utils.write_trigger_data(exchange_folder, message), None
+
+
+class StandInServer:
+    """Pure-Python listener that answers like the Cascadeur side.
+
+    handler(message) -> reply dict is called for every message; the
+    default acknowledges it. Use port=0 to pick a free port.
+    """
+
+    def __init__(self, port=0, host=DEFAULT_HOST, handler=None):
+        self.handler = handler or self.acknowledge
+        self.received = 0
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((host, port))
+        self._sock.listen()
+        self.host, self.port = self._sock.getsockname()[:2]
+        self._running = False
+        self._thread = None
+        self._connections = set()
+
+    @staticmethod
+    def acknowledge(message):
+        if message.get("action") == "ping":
+            return {"status": "alive", "pid": os.getpid(), "queued": 0}
+        return {"status": "queued", "action": message.get("action"),
+                "sequence": message.get("sequence"), "request_id": message.get("request_id")}
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._accept_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        # shutdown wakes the thread blocked in accept
+        for sock in [self._sock] + list(self._connections):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            try:
+                sock.close()
+            except OSError:
+                pass
+        if self._thread:
+            self._thread.join(timeout=1.0)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._connections.add(conn)
+        with conn:
+            while self._running:
+                try:
+                    message = recv_message(conn)
+                    if message is None:
+                        break
+                    self.received += 1
+                    send_message(conn, self.handler(message))
+                except (OSError, ValueError):
+                    break
+        self._connections.discard(conn)
+
+
+def benchmark_round_trip(count=1000, payload_frames=100):
+    """Compare socket round trips against writing trigger files.
+
+    Returns a dict with socket latency percentiles and the mean time to
+    write one trigger file, all in milliseconds.
+    """
+    data = {"keyframes": {str(frame): True for frame in range(payload_frames)}}
+
+    with StandInServer() as server:
+        client = SocketClient(server.port)
+        latencies = []
+        for _ in range(count):
+            start = time.perf_counter()
+            reply = client.request(file_utils.build_trigger_data("benchmark", data))
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            if not reply or reply.get("status") != "queued":
+                raise RuntimeError(f"Unexpected reply: {reply}")
+        client.close()
+
+    with tempfile.TemporaryDirectory(prefix="btc_socket_") as folder:
+        start = time.perf_counter()
+        for _ in range(count):
+            file_utils.create_trigger_file(folder, "benchmark", data)
+        file_ms = (time.perf_counter() - start) * 1000.0 / count
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))]
+
+    result = {
+        "messages": count,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "max_ms": latencies[-1],
+        "file_write_ms": file_ms,
+    }
+    print(f"Socket round trip: {count} messages, p50 {result['p50_ms']:.3f} ms, "
+          f"p95 {result['p95_ms']:.3f} ms, max {result['max_ms']:.3f} ms")
+    print(f"Trigger file write only: {file_ms:.3f} ms per trigger "
+          f"(pickup adds the watcher latency on top)")
+    return result
+
+
+if __name__ == "__main__":
+    benchmark_round_trip()
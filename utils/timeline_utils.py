@@ -1,18 +1,94 @@
 import bpy
+from contextlib import contextmanager
+from . import preferences, keyframe_scan
+
+# Generation counter: bumped whenever marks change, compared against the
+# generation each scene's markers were last synced at
+_mark_generation = 0
+_synced_generation = {}
+
+def bump_mark_generation():
+    """Record that marked frames changed and markers need a sync."""
+    global _mark_generation
+    _mark_generation += 1
+    return _mark_generation
+
+def is_markers_synced(scene):
+    """True if the scene's markers reflect the latest mark generation."""
+    return _synced_generation.get(scene.name) == _mark_generation
+
+def _set_markers_synced(scene):
+    _synced_generation[scene.name] = _mark_generation
 
 # Frame change handler to update timeline markers
 @bpy.app.handlers.persistent
 def frame_change_handler(scene):
     """Handler called on frame change"""
-    # Only update if markers are enabled
+    # Only update if markers are enabled and marks changed since the last sync
     if hasattr(scene, "btc_show_markers") and scene.btc_show_markers:
-        update_timeline_markers(scene)
+        if not is_markers_synced(scene):
+            update_timeline_markers(scene)
+
+def refresh_frame_change_handler(scene):
+    """Attach or detach frame_change_handler depending on marker visibility."""
+    handlers = bpy.app.handlers.frame_change_post
+    prefs = preferences.get_preferences(bpy.context)
+    detach = getattr(prefs, "detach_marker_handler", True) if prefs else True
+    show_markers = getattr(scene, "btc_show_markers", True)
+    
+    if show_markers or not detach:
+        if frame_change_handler not in handlers:
+            handlers.append(frame_change_handler)
+    elif frame_change_handler in handlers:
+        handlers.remove(frame_change_handler)
+
+def show_markers_update(self, context):
+    """Update callback of Scene.btc_show_markers"""
+    update_timeline_markers(self)
+    refresh_frame_change_handler(self)
+
+# Depth of nested batch_mark_edits blocks
+_batch_depth = 0
+
+@contextmanager
+def batch_mark_edits(scene):
+    """Suspend per-item mark callbacks and sync markers once on exit.
+    
+    Usage:
+        with timeline_utils.batch_mark_edits(context.scene):
+            for item in context.scene.btc_keyframes:
+                item.is_marked = True
+    """
+    global _batch_depth
+    _batch_depth += 1
+    try:
+        yield
+    finally:
+        _batch_depth -= 1
+        if _batch_depth == 0:
+            bump_mark_generation()
+            update_timeline_markers(scene)
 
 def mark_update_callback(self, context):
     """Callback when a keyframe's marked status changes"""
-    # Update timeline markers if enabled
-    if context and hasattr(context, "scene") and hasattr(context.scene, "btc_show_markers") and context.scene.btc_show_markers:
-        update_timeline_markers(context.scene)
+    # Bulk edits sync once when the batch ends
+    if _batch_depth:
+        return
+    
+    if not context or not hasattr(context, "scene"):
+        bump_mark_generation()
+        return
+    
+    scene = context.scene
+    was_synced = is_markers_synced(scene)
+    bump_mark_generation()
+    
+    # Update the marker of this frame only if markers are enabled
+    if hasattr(scene, "btc_show_markers") and scene.btc_show_markers:
+        set_frame_marker(scene, self.frame, self.is_marked)
+        # A single-frame update keeps an already synced scene in sync
+        if was_synced:
+            _set_markers_synced(scene)
 
 def update_timeline_markers(scene):
     """Update timeline markers based on marked keyframes"""
@@ -33,36 +109,95 @@ def update_timeline_markers(scene):
     # Check if markers should be shown
     if not actual_scene.btc_show_markers:
         # Remove all B2C markers
-        for marker in list(actual_scene.timeline_markers):
-            if marker.name.startswith("Key:"):
-                actual_scene.timeline_markers.remove(marker)
+        sync_timeline_markers(actual_scene, ())
+        _synced_generation.pop(actual_scene.name, None)
         return
     
-    # Get list of marked frames
-    marked_frames = get_marked_frames(actual_scene)
+    # Only add/remove the markers that changed
+    sync_timeline_markers(actual_scene, get_marked_frames(actual_scene))
+    _set_markers_synced(actual_scene)
+
+MARKER_PREFIX = "Key:"
+
+# Per-scene index: frame -> name of the B2C marker on that frame
+_marker_index = {}
+
+def _marker_name(frame):
+    return f"{MARKER_PREFIX}{frame}"
+
+def _get_marker_index(scene):
+    """Return the frame -> marker name index of a scene, building it if needed."""
+    index = _marker_index.get(scene.name)
+    if index is None:
+        index = {}
+        for marker in list(scene.timeline_markers):
+            if marker.name.startswith(MARKER_PREFIX):
+                if marker.frame in index:
+                    # Duplicate marker from an older full rebuild
+                    scene.timeline_markers.remove(marker)
+                    continue
+                index[marker.frame] = marker.name
+        _marker_index[scene.name] = index
+    return index
+
+def invalidate_marker_index(scene=None):
+    """Drop the cached marker index so it is rebuilt from the scene."""
+    if scene is None:
+        _marker_index.clear()
+    else:
+        _marker_index.pop(scene.name, None)
+
+def _add_marker(scene, index, frame):
+    name = _marker_name(frame)
+    scene.timeline_markers.new(name, frame=frame)
+    index[frame] = name
+
+def _remove_marker(scene, index, frame):
+    name = index.pop(frame, None)
+    if name is None:
+        return
+    marker = scene.timeline_markers.get(name)
+    if marker is not None:
+        scene.timeline_markers.remove(marker)
+
+def set_frame_marker(scene, frame, marked):
+    """Add or remove the marker of a single frame."""
+    index = _get_marker_index(scene)
+    if marked and frame not in index:
+        _add_marker(scene, index, frame)
+    elif not marked and frame in index:
+        _remove_marker(scene, index, frame)
+
+def sync_timeline_markers(scene, marked_frames):
+    """Bring B2C markers in line with marked_frames, touching only the difference."""
+    index = _get_marker_index(scene)
+    wanted = set(marked_frames)
+    current = set(index)
     
-    # First remove old markers
-    for marker in list(actual_scene.timeline_markers):
-        if marker.name.startswith("Key:"):
-            actual_scene.timeline_markers.remove(marker)
+    for frame in current - wanted:
+        _remove_marker(scene, index, frame)
     
-    # Create new markers for each marked frame
-    for frame in marked_frames:
-        # Create marker with frame number as name
-        marker = actual_scene.timeline_markers.new(f"Key:{frame}", frame=frame)
-        # Set marker color (green)
-        marker.color = (0.2, 0.8, 0.2)
+    for frame in sorted(wanted - current):
+        _add_marker(scene, index, frame)
+
+@bpy.app.handlers.persistent
+def marker_index_reset_handler(*args):
+    """Undo, redo and file loads replace the marker collection, so forget the index."""
+    invalidate_marker_index()
+    # Marks may have changed with the scene data
+    bump_mark_generation()
+    
+    scene = getattr(bpy.context, "scene", None)
+    if scene is not None:
+        refresh_frame_change_handler(scene)
 
 def get_marked_frames(scene):
     """Get list of marked frames"""
-    marked_frames = []
-    
-    if hasattr(scene, "btc_keyframes"):
-        for item in scene.btc_keyframes:
-            if item.is_marked:
-                marked_frames.append(item.frame)
+    if not hasattr(scene, "btc_keyframes"):
+        return []
     
-    return marked_frames
+    frames, marked = keyframe_scan.read_keyframe_list(scene.btc_keyframes)
+    return frames[marked].tolist()
 
 def is_auto_rig_pro_armature(armature):
     """Check if armature is an Auto-Rig Pro rig"""